@@ -1,15 +1,25 @@
+from django.db.models import Case, When
 from django_filters.rest_framework import FilterSet, filters
 
 from recipes.models import Ingredient, Recipe, Tag
+from recipes.search import search_ingredients
 
 
 class IngredientFilter(FilterSet):
-    name = filters.CharFilter(lookup_expr="startswith")
+    name = filters.CharFilter(method="filter_name")
 
     class Meta:
         model = Ingredient
         fields = ("name",)
 
+    def filter_name(self, queryset, name, value):
+        ids = search_ingredients(value)
+        if not ids:
+            return queryset.none()
+        return queryset.filter(id__in=ids).order_by(
+            Case(*(When(id=pk, then=rank) for rank, pk in enumerate(ids)))
+        )
+
 
 class RecipeFilter(FilterSet):
     tags = filters.ModelMultipleChoiceFilter(
@@ -24,6 +34,21 @@ class RecipeFilter(FilterSet):
         method="filter_is_in_shopping_cart"
     )
 
+    calories_min = filters.NumberFilter(
+        field_name="calories", lookup_expr="gte"
+    )
+    calories_max = filters.NumberFilter(
+        field_name="calories", lookup_expr="lte"
+    )
+
+    ordering = filters.OrderingFilter(
+        fields=(
+            ("pub_date", "pub_date"),
+            ("trending_score", "trending"),
+            ("calories", "calories"),
+        )
+    )
+
     class Meta:
         model = Recipe
         fields = (
@@ -0,0 +1,25 @@
+import time
+from datetime import datetime
+
+from django.core.management.base import BaseCommand
+
+from api.throttles import store
+
+
+class Command(BaseCommand):
+    help = "Показывает число отклонённых ограничителем запросов по областям"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--purge-hours",
+            type=float,
+            help="Удалить корзины, не обновлявшиеся указанное число часов",
+        )
+
+    def handle(self, *args, **options):
+        if options["purge_hours"] is not None:
+            purged = store.purge(time.time() - options["purge_hours"] * 3600)
+            self.stdout.write(f"Удалено корзин: {purged}")
+        for scope, total, last in store.rejections():
+            last = datetime.fromtimestamp(last).isoformat(timespec="seconds")
+            self.stdout.write(f"{scope}\t{total}\t{last}")
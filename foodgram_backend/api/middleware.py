@@ -0,0 +1,83 @@
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_string
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def accepted_encodings(header):
+    """Кодировки из заголовка Accept-Encoding с их q-значениями."""
+    weights = {}
+    for item in header.split(","):
+        coding, *params = item.split(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        weight = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[coding] = weight
+    return weights
+
+
+def choose_encoding(header):
+    """Поддерживаемая кодировка с наибольшим q или None.
+
+    Кодировки с q=0 запрещены клиентом, "*" задаёт вес остальных; при
+    равных весах предпочитается brotli.
+    """
+    weights = accepted_encodings(header)
+    supported = ("br", "gzip") if brotli is not None else ("gzip",)
+    default = weights.get("*", 0.0)
+    best = max(supported, key=lambda coding: weights.get(coding, default))
+    if weights.get(best, default) > 0:
+        return best
+    return None
+
+
+class CompressionMiddleware:
+    """Сжимает ответы больше COMPRESSION_MIN_SIZE байт алгоритмом brotli
+    или gzip в зависимости от заголовка Accept-Encoding"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if (
+            response.streaming
+            or response.has_header("Content-Encoding")
+            or len(response.content) < settings.COMPRESSION_MIN_SIZE
+        ):
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        encoding = choose_encoding(
+            request.META.get("HTTP_ACCEPT_ENCODING", "")
+        )
+        if encoding == "br":
+            content = brotli.compress(
+                response.content, quality=settings.BROTLI_QUALITY
+            )
+        elif encoding == "gzip":
+            content = compress_string(response.content)
+        else:
+            return response
+        if len(content) >= len(response.content):
+            return response
+
+        response.content = content
+        response["Content-Length"] = str(len(content))
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response["ETag"] = "W/" + etag
+        response["Content-Encoding"] = encoding
+        return response
@@ -1,5 +1,96 @@
-from rest_framework.pagination import PageNumberPagination
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import (
+    Cursor,
+    CursorPagination,
+    PageNumberPagination,
+)
+
+from recipes.feed import get_feed
+from recipes.paginators import EstimatedCountPaginator
 
 
 class CustomPagination(PageNumberPagination):
+    """Пагинация по номеру страницы.
+
+    С параметром ``count=approximate`` на больших выборках вместо
+    COUNT(*) возвращается оценка, а в ответ добавляется ``count_exact``.
+    """
+
     page_size_query_param = "limit"
+    count_query_param = "count"
+    approximate_count_value = "approximate"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.approximate = (
+            request.query_params.get(self.count_query_param)
+            == self.approximate_count_value
+        )
+        if self.approximate:
+            self.django_paginator_class = EstimatedCountPaginator
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        if self.approximate:
+            response.data["count_exact"] = self.page.paginator.exact
+        return response
+
+
+class FeedPagination(CursorPagination):
+    """Курсорная пагинация ленты по ключу (pub_date, id рецепта).
+
+    Лента собирается из нескольких выборок, поэтому страницу строит
+    recipes.feed.get_feed, а в курсоре хранится ключ крайнего рецепта.
+    """
+
+    ordering = "-pub_date"
+    page_size_query_param = "limit"
+
+    def paginate_feed(self, user, request):
+        """Возвращает id рецептов страницы ленты пользователя."""
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+        reverse = cursor is not None and cursor.reverse
+        position = None
+        if cursor is not None and cursor.position is not None:
+            position = self.decode_position(cursor.position)
+        keys = get_feed(user, position, reverse, self.page_size + 1)
+        more = len(keys) > self.page_size
+        if reverse:
+            keys = keys[1:] if more else keys
+            has_next, has_previous = True, more
+        else:
+            keys = keys[: self.page_size]
+            has_next, has_previous = more, position is not None
+        self.next_key = keys[-1] if keys and has_next else None
+        self.previous_key = keys[0] if keys and has_previous else None
+        return [recipe_id for _, recipe_id in keys]
+
+    def decode_position(self, position):
+        pub_date, _, recipe_id = position.rpartition("|")
+        pub_date = parse_datetime(pub_date)
+        if pub_date is None or not recipe_id.isdigit():
+            raise NotFound(self.invalid_cursor_message)
+        return pub_date, int(recipe_id)
+
+    def encode_key(self, key, reverse):
+        pub_date, recipe_id = key
+        return self.encode_cursor(
+            Cursor(
+                offset=0,
+                reverse=reverse,
+                position=f"{pub_date.isoformat()}|{recipe_id}",
+            )
+        )
+
+    def get_next_link(self):
+        if self.next_key is None:
+            return None
+        return self.encode_key(self.next_key, reverse=False)
+
+    def get_previous_link(self):
+        if self.previous_key is None:
+            return None
+        return self.encode_key(self.previous_key, reverse=True)
@@ -0,0 +1,83 @@
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from rest_framework.permissions import SAFE_METHODS
+
+PIN_COOKIE = "primary_pin"
+PIN_SALT = "api.replicas.pin"
+
+read_from_replica = ContextVar("read_from_replica", default=False)
+
+
+class ReplicaRouter:
+    """Роутер: чтения помеченных запросов идут на реплики, остальное на
+    основную базу"""
+
+    def db_for_read(self, model, **hints):
+        if settings.DATABASE_REPLICAS and read_from_replica.get():
+            return random.choice(settings.DATABASE_REPLICAS)
+        return "default"
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+
+def pin_to_primary(response, user):
+    """Закрепление хранится в подписанной cookie, а не в кэше процесса,
+    поэтому его видит любой воркер."""
+    response.set_signed_cookie(
+        PIN_COOKIE,
+        str(user.pk),
+        salt=PIN_SALT,
+        max_age=settings.REPLICA_PIN_SECONDS,
+        httponly=True,
+        samesite="Lax",
+    )
+
+
+def is_pinned(request):
+    return request.user.is_authenticated and request.get_signed_cookie(
+        PIN_COOKIE,
+        default=None,
+        salt=PIN_SALT,
+        max_age=settings.REPLICA_PIN_SECONDS,
+    ) == str(request.user.pk)
+
+
+class ReplicaReadMixin:
+    """Безопасные запросы читают с реплик. После успешной записи
+    пользователь на короткое время закрепляется за основной базой,
+    чтобы сразу видеть свои изменения."""
+
+    def dispatch(self, request, *args, **kwargs):
+        # Флаг сбрасывается в finally: при необработанном исключении DRF
+        # не вызывает finalize_response, а поток воркера переиспользуется.
+        token = read_from_replica.set(False)
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            read_from_replica.reset(token)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if (
+            settings.DATABASE_REPLICAS
+            and request.method in SAFE_METHODS
+            and not is_pinned(request)
+        ):
+            read_from_replica.set(True)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        read_from_replica.set(False)
+        if (
+            settings.DATABASE_REPLICAS
+            and request.method not in SAFE_METHODS
+            and request.user.is_authenticated
+            and response.status_code < 400
+        ):
+            pin_to_primary(response, request.user)
+        return super().finalize_response(request, response, *args, **kwargs)
@@ -1,24 +1,47 @@
+from collections.abc import Mapping
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError as DjangoValidationError
 from django.core.validators import MaxValueValidator, MinValueValidator
+from django.db.models import Manager
 from django.db.transaction import atomic
 from djoser.serializers import UserSerializer
 from drf_extra_fields.fields import Base64ImageField
 from rest_framework import serializers, status
 from rest_framework.exceptions import ValidationError
 
+from recipes import documents, nutrition, search
 from recipes.models import (
     FavoriteRecipe,
     Ingredient,
     IngredientsRecipe,
+    MealPlan,
+    MealPlanItem,
     Recipe,
     ShoppingCart,
     Tag,
 )
-from users.models import Subscribe, User
+from recipes.similarity import reindex
+from users.models import User
 
 MIN_VALUE_COOKING_TIME = 1
 MAX_VALUE_COOKING_TIME = 32000
 MIN_VALUE_AMOUNT = 1
 MAX_VALUE_AMOUNT = 32000
+MIN_VALUE_SERVINGS = Decimal("0.25")
+MAX_VALUE_SERVINGS = 100
+
+
+def sparse_fields(request, fields):
+    """Поля, оставшиеся после параметров запроса fields и omit"""
+    fields = set(fields)
+    requested = request.query_params.get("fields")
+    if requested:
+        fields &= set(requested.split(","))
+    omitted = request.query_params.get("omit")
+    if omitted:
+        fields -= set(omitted.split(","))
+    return fields
 
 
 class CustomUserSerializer(UserSerializer):
@@ -38,10 +61,16 @@ class CustomUserSerializer(UserSerializer):
         )
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, "subscribed"):
+            return obj.subscribed
         user = self.context.get("request").user
-        return user.is_authenticated and bool(
-            Subscribe.objects.filter(user=user, author=obj)
-        )
+        if not user.is_authenticated:
+            return False
+        if "subscribed_ids" not in self.context:
+            self.context["subscribed_ids"] = set(
+                user.subscriber.values_list("author_id", flat=True)
+            )
+        return obj.id in self.context["subscribed_ids"]
 
 
 class SubscribeSerializer(CustomUserSerializer):
@@ -77,6 +106,8 @@ class SubscribeSerializer(CustomUserSerializer):
         return RecipeShowSerializer(recipes, many=True).data
 
     def get_recipes_count(self, obj):
+        if "recipes" in getattr(obj, "_prefetched_objects_cache", {}):
+            return len(obj.recipes.all())
         return obj.recipes.count()
 
 
@@ -115,9 +146,20 @@ class RecipeIngredientSerializer(serializers.ModelSerializer):
         fields = ("id", "name", "measurement_unit", "amount")
 
 
+class RecipeListSerializer(serializers.ListSerializer):
+    """Список рецептов: недостающие документы строятся одной пачкой"""
+
+    def to_representation(self, data):
+        recipes = list(data.all() if isinstance(data, Manager) else data)
+        self.child.preloaded_documents = documents.get_many(recipes)
+        return super().to_representation(recipes)
+
+
 class RecipeGetSerializer(serializers.ModelSerializer):
     """Сериализатор рецептов"""
 
+    preloaded_documents = {}
+
     author = CustomUserSerializer()
     tags = TagSerializer(many=True)
     ingredients = RecipeIngredientSerializer(
@@ -126,6 +168,7 @@ class RecipeGetSerializer(serializers.ModelSerializer):
     is_favorited = serializers.SerializerMethodField(read_only=True)
     is_in_shopping_cart = serializers.SerializerMethodField(read_only=True)
     image = Base64ImageField()
+    nutrition = serializers.SerializerMethodField(read_only=True)
 
     class Meta:
         model = Recipe
@@ -140,9 +183,23 @@ class RecipeGetSerializer(serializers.ModelSerializer):
             "image",
             "text",
             "cooking_time",
+            "portions",
+            "nutrition",
         )
+        list_serializer_class = RecipeListSerializer
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get("request")
+        if request is not None:
+            for name in set(self.fields) - sparse_fields(
+                request, self.fields
+            ):
+                self.fields.pop(name)
 
     def get_is_favorited(self, obj):
+        if hasattr(obj, "favorited"):
+            return obj.favorited
         user = self.context.get("request").user
         return (
             user.is_authenticated
@@ -150,17 +207,118 @@ class RecipeGetSerializer(serializers.ModelSerializer):
         )
 
     def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, "in_shopping_cart"):
+            return obj.in_shopping_cart
         user = self.context.get("request").user
         return (
             user.is_authenticated
             and user.shopping_cart.filter(recipe=obj).exists()
         )
 
+    def get_nutrition(self, obj):
+        return {
+            "total": {
+                nutrient: round(getattr(obj, nutrient), 1)
+                for nutrient in nutrition.NUTRIENTS
+            },
+            "per_portion": nutrition.per_portion(obj),
+        }
+
+    def to_representation(self, obj):
+        """Готовый документ рецепта с полями текущего пользователя."""
+        document = self.preloaded_documents.get(obj.id)
+        if document is None:
+            document = documents.get(obj)
+        request = self.context.get("request")
+        data = {}
+        for name in self.fields:
+            if name == "is_favorited":
+                data[name] = self.get_is_favorited(obj)
+            elif name == "is_in_shopping_cart":
+                data[name] = self.get_is_in_shopping_cart(obj)
+            elif name == "author":
+                author = dict(document["author"])
+                author["is_subscribed"] = self.fields[
+                    "author"
+                ].get_is_subscribed(User(id=author["id"]))
+                data[name] = author
+            elif name == "image" and request is not None:
+                data[name] = request.build_absolute_uri(document["image"])
+            else:
+                data[name] = document[name]
+        return data
+
+
+class AuthorDocumentSerializer(CustomUserSerializer):
+    """Сериализатор автора для документа рецепта"""
+
+    is_subscribed = None
+
+    class Meta(CustomUserSerializer.Meta):
+        fields = ("email", "id", "username", "first_name", "last_name")
+
+
+class RecipeDocumentSerializer(RecipeGetSerializer):
+    """Сериализатор документа рецепта без полей текущего пользователя"""
+
+    author = AuthorDocumentSerializer()
+    is_favorited = None
+    is_in_shopping_cart = None
+
+    class Meta(RecipeGetSerializer.Meta):
+        fields = tuple(
+            name
+            for name in RecipeGetSerializer.Meta.fields
+            if name not in ("is_favorited", "is_in_shopping_cart")
+        )
+        list_serializer_class = serializers.ListSerializer
+
+    def to_representation(self, obj):
+        return serializers.ModelSerializer.to_representation(self, obj)
+
+
+def load_in_bulk(queryset, values):
+    """Объекты выборки по сырым id одним запросом; негодные id пропускаются"""
+    pks = set()
+    for value in values:
+        if isinstance(value, bool):
+            continue
+        try:
+            pks.add(queryset.model._meta.pk.to_python(value))
+        except DjangoValidationError:
+            continue
+    pks.discard(None)
+    return queryset.in_bulk(pks)
+
+
+class BulkPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """Поле id, берущее объекты из загруженных корневым сериализатором.
+
+    Корневой сериализатор кладёт в атрибут preloaded словари объектов по
+    модели; без них поле работает как обычное PrimaryKeyRelatedField.
+    Сообщения об ошибках совпадают.
+    """
+
+    def to_internal_value(self, data):
+        preloaded = getattr(self.root, "preloaded", {})
+        objects = preloaded.get(self.get_queryset().model)
+        if objects is None:
+            return super().to_internal_value(data)
+        if isinstance(data, bool):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        try:
+            pk = self.get_queryset().model._meta.pk.to_python(data)
+        except DjangoValidationError:
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        if pk not in objects:
+            self.fail("does_not_exist", pk_value=data)
+        return objects[pk]
+
 
 class RecipeIngredientCreateSerializer(serializers.ModelSerializer):
     """Сериализатор для ингридиентов при создании рецепта"""
 
-    id = serializers.PrimaryKeyRelatedField(queryset=Ingredient.objects.all())
+    id = BulkPrimaryKeyRelatedField(queryset=Ingredient.objects.all())
     amount = serializers.IntegerField(
         validators=[
             MinValueValidator(MIN_VALUE_AMOUNT),
@@ -176,9 +334,7 @@ class RecipeIngredientCreateSerializer(serializers.ModelSerializer):
 class RecipeCreateSerializer(serializers.ModelSerializer):
     """Сериализатор создания/изминения рецепта"""
 
-    tags = serializers.PrimaryKeyRelatedField(
-        many=True, queryset=Tag.objects.all()
-    )
+    tags = BulkPrimaryKeyRelatedField(many=True, queryset=Tag.objects.all())
     author = CustomUserSerializer(read_only=True)
     ingredients = RecipeIngredientCreateSerializer(many=True)
     image = Base64ImageField()
@@ -199,9 +355,32 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
             "name",
             "text",
             "cooking_time",
+            "portions",
             "author",
         )
 
+    def to_internal_value(self, data):
+        tags = data.get("tags") if isinstance(data, Mapping) else None
+        ingredients = (
+            data.get("ingredients") if isinstance(data, Mapping) else None
+        )
+        if not isinstance(tags, list):
+            tags = []
+        if not isinstance(ingredients, list):
+            ingredients = []
+        self.preloaded = {
+            Tag: load_in_bulk(Tag.objects.all(), tags),
+            Ingredient: load_in_bulk(
+                Ingredient.objects.all(),
+                (
+                    ingredient.get("id")
+                    for ingredient in ingredients
+                    if isinstance(ingredient, Mapping)
+                ),
+            ),
+        }
+        return super().to_internal_value(data)
+
     def validate(self, data):
         if not data.get("tags"):
             raise serializers.ValidationError(
@@ -235,6 +414,10 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
                 )
             )
         IngredientsRecipe.objects.bulk_create(ingredients_list)
+        search.schedule_usage_refresh()
+        nutrition.recompute([recipe.id])
+        recipe.refresh_from_db(fields=nutrition.NUTRIENTS)
+        reindex.enqueue(recipe.id, dedupe_key=f"similarity:{recipe.id}")
 
     @atomic
     def create(self, validated_data):
@@ -251,7 +434,10 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
         instance.image = validated_data.get("image", instance.image)
         tags = validated_data.pop("tags")
         ingredients = validated_data.pop("ingredients")
-        instance.ingredients.clear()
+        # Без сигналов: итоги и счётчики пересчитывает create_tags_ingredients
+        # один раз на рецепт, а не по задаче на каждую удалённую строку.
+        rows = IngredientsRecipe.objects.filter(recipe=instance)
+        rows._raw_delete(rows.db)
         self.create_tags_ingredients(instance, tags, ingredients)
         return super().update(instance, validated_data)
 
@@ -313,3 +499,61 @@ class FavoriteRecipeSerializer(serializers.ModelSerializer):
 
     def to_representation(self, instance):
         return RecipeShowSerializer(instance.recipe).data
+
+
+class MealPlanItemSerializer(serializers.ModelSerializer):
+    """Сериализатор рецепта в плане питания"""
+
+    recipe = serializers.PrimaryKeyRelatedField(queryset=Recipe.objects.all())
+    servings = serializers.DecimalField(
+        max_digits=5,
+        decimal_places=2,
+        required=False,
+        validators=[
+            MinValueValidator(MIN_VALUE_SERVINGS),
+            MaxValueValidator(MAX_VALUE_SERVINGS),
+        ],
+    )
+
+    class Meta:
+        model = MealPlanItem
+        fields = ("id", "recipe", "day", "servings")
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        data["recipe"] = RecipeShowSerializer(
+            instance.recipe, context=self.context
+        ).data
+        return data
+
+
+class MealPlanSerializer(serializers.ModelSerializer):
+    """Сериализатор плана питания"""
+
+    items = MealPlanItemSerializer(many=True)
+
+    class Meta:
+        model = MealPlan
+        fields = ("id", "name", "start_date", "items")
+
+    def create_items(self, plan, items):
+        MealPlanItem.objects.bulk_create(
+            MealPlanItem(plan=plan, **item) for item in items
+        )
+
+    @atomic
+    def create(self, validated_data):
+        items = validated_data.pop("items")
+        plan = MealPlan.objects.create(
+            user=self.context["request"].user, **validated_data
+        )
+        self.create_items(plan, items)
+        return plan
+
+    @atomic
+    def update(self, instance, validated_data):
+        items = validated_data.pop("items", None)
+        if items is not None:
+            instance.items.all().delete()
+            self.create_items(instance, items)
+        return super().update(instance, validated_data)
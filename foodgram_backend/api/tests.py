@@ -0,0 +1,324 @@
+import threading
+from contextlib import contextmanager
+from unittest import mock, skipUnless
+
+from django.core.cache import cache
+from django.db import connection, connections, transaction
+from django.test import (
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from recipes import feed
+from recipes.models import (
+    FeedEntry,
+    Ingredient,
+    IngredientsRecipe,
+    Recipe,
+    Tag,
+)
+from users.models import Subscribe, User
+
+from .middleware import choose_encoding
+from .replicas import PIN_COOKIE, read_from_replica
+from .views import RecipeViewSet
+
+
+class ReplicaPinTests(TestCase):
+    databases = {"default", "replica_0"}
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="author", email="author@example.com", password="pass"
+        )
+        self.recipe = Recipe.objects.create(
+            author=self.user,
+            name="Рецепт",
+            text="Описание",
+            cooking_time=10,
+            image="recipes/image.png",
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def read(self):
+        """Список рецептов; возвращает число запросов к каждой базе."""
+        with CaptureQueriesContext(
+            connections["default"]
+        ) as primary, CaptureQueriesContext(
+            connections["replica_0"]
+        ) as replica:
+            response = self.client.get("/api/recipes/")
+        self.assertEqual(response.status_code, 200)
+        return len(primary), len(replica)
+
+    def test_reads_go_to_replica(self):
+        primary, replica = self.read()
+        self.assertGreater(replica, 0)
+
+    def test_write_pins_reads_to_primary(self):
+        response = self.client.post(f"/api/recipes/{self.recipe.id}/favorite/")
+        self.assertEqual(response.status_code, 201)
+        self.assertIn(PIN_COOKIE, response.cookies)
+        primary, replica = self.read()
+        self.assertGreater(primary, 0)
+        self.assertEqual(replica, 0)
+
+    def test_pin_belongs_to_user(self):
+        self.client.post(f"/api/recipes/{self.recipe.id}/favorite/")
+        other = User.objects.create_user(
+            username="other", email="other@example.com", password="pass"
+        )
+        self.client.force_authenticate(other)
+        primary, replica = self.read()
+        self.assertGreater(replica, 0)
+
+    @override_settings(REPLICA_PIN_SECONDS=0)
+    def test_pin_expires(self):
+        self.client.post(f"/api/recipes/{self.recipe.id}/favorite/")
+        primary, replica = self.read()
+        self.assertGreater(replica, 0)
+
+    def test_forged_pin_is_ignored(self):
+        self.client.cookies[PIN_COOKIE] = str(self.user.pk)
+        primary, replica = self.read()
+        self.assertGreater(replica, 0)
+
+    def test_flag_is_reset_after_exception(self):
+        with mock.patch.object(
+            RecipeViewSet, "list", side_effect=RuntimeError
+        ):
+            with self.assertRaises(RuntimeError):
+                self.client.get("/api/recipes/")
+        self.assertFalse(read_from_replica.get())
+
+
+@override_settings(DATABASE_REPLICAS=[])
+class RecipeUpdateQueriesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username="author", email="author@example.com", password="pass"
+        )
+        cls.tag = Tag.objects.create(
+            name="Завтрак", color="#E26C2D", slug="breakfast"
+        )
+        Ingredient.objects.bulk_create(
+            Ingredient(name=f"ингредиент {number}", measurement_unit="г")
+            for number in range(30)
+        )
+        cls.ingredients = list(Ingredient.objects.order_by("id"))
+        cls.recipe = Recipe.objects.create(
+            author=cls.user,
+            name="Рецепт",
+            text="Описание",
+            cooking_time=10,
+            image="recipes/image.png",
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def patch_queries(self, count):
+        payload = {
+            "tags": [self.tag.id],
+            "ingredients": [
+                {"id": ingredient.id, "amount": 2}
+                for ingredient in self.ingredients[:count]
+            ],
+        }
+        with CaptureQueriesContext(connections["default"]) as queries:
+            response = self.client.patch(
+                f"/api/recipes/{self.recipe.id}/", payload, format="json"
+            )
+        self.assertEqual(response.status_code, 200, response.content)
+        return len(queries)
+
+    def test_queries_do_not_grow_with_ingredients(self):
+        # Первое изменение ещё строит документ и назначает теги. Каждое
+        # следующее удаляет столько строк состава, сколько вставило прошлое.
+        self.patch_queries(3)
+        few = self.patch_queries(3)
+        self.patch_queries(30)
+        self.assertEqual(self.patch_queries(30), few)
+        self.assertEqual(
+            IngredientsRecipe.objects.filter(recipe=self.recipe).count(), 30
+        )
+
+
+@override_settings(DATABASE_REPLICAS=[], FEED_FANOUT_MAX_SUBSCRIBERS=1)
+class FeedTests(TestCase):
+    def setUp(self):
+        cache.delete(feed.POPULAR_AUTHORS_CACHE_KEY)
+        self.reader, self.author, self.star, other = (
+            User.objects.create_user(
+                username=name, email=f"{name}@example.com", password="pass"
+            )
+            for name in ("reader", "author", "star", "other")
+        )
+        Subscribe.objects.bulk_create(
+            [
+                Subscribe(user=self.reader, author=self.author),
+                Subscribe(user=self.reader, author=self.star),
+                Subscribe(user=other, author=self.star),
+            ]
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.reader)
+
+    def publish(self, author):
+        """Рецепт автора; обычного автора раскладывает по ленте читателя."""
+        recipe = Recipe.objects.create(
+            author=author,
+            name="Рецепт",
+            text="Описание",
+            cooking_time=10,
+            image="recipes/image.png",
+        )
+        if author == self.author:
+            feed.add_entries([self.reader.id], [recipe])
+        return recipe.id
+
+    def page(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.data
+
+    def test_popular_authors_publish_between_pages(self):
+        published = [
+            self.publish(author)
+            for author in (self.author, self.star) * 3
+        ]
+        entries = FeedEntry.objects.count()
+        first = self.page("/api/recipes/feed/?limit=4")
+        self.assertEqual(
+            [recipe["id"] for recipe in first["results"]],
+            published[:1:-1],
+        )
+        self.assertIsNone(first["previous"])
+        self.publish(self.star)
+        self.publish(self.author)
+        second = self.page(first["next"])
+        self.assertEqual(
+            [recipe["id"] for recipe in second["results"]],
+            published[1::-1],
+        )
+        self.assertIsNone(second["next"])
+        back = self.page(second["previous"])
+        self.assertEqual(back["results"], first["results"])
+        self.assertEqual(FeedEntry.objects.count(), entries + 1)
+
+    def test_backfilled_popular_recipe_is_not_repeated(self):
+        recipe_id = self.publish(self.star)
+        feed.add_entries(
+            [self.reader.id], Recipe.objects.filter(id=recipe_id)
+        )
+        results = self.page("/api/recipes/feed/")["results"]
+        self.assertEqual([recipe["id"] for recipe in results], [recipe_id])
+
+
+@skipUnless(
+    connection.vendor == "postgresql",
+    "Открытые транзакции видны только в pg_stat_activity PostgreSQL",
+)
+@override_settings(DATABASE_REPLICAS=[], SYNC_SETTLE_SECONDS=0)
+class SyncTests(TransactionTestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="author", email="author@example.com", password="pass"
+        )
+        self.first, self.second = (
+            Recipe.objects.create(
+                author=self.user,
+                name="Рецепт",
+                text="Описание",
+                cooking_time=10,
+                image="recipes/image.png",
+            )
+            for _ in range(2)
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def sync(self, watermark=None):
+        params = {"since": watermark} if watermark else {}
+        response = self.client.get("/api/sync/", params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.data
+
+    @contextmanager
+    def open_transaction(self, write):
+        """Выполняет write в транзакции другого соединения и не фиксирует
+        её до выхода из блока."""
+        written, release = threading.Event(), threading.Event()
+
+        def run():
+            try:
+                with transaction.atomic():
+                    write()
+                    written.set()
+                    release.wait(10)
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=run)
+        thread.start()
+        try:
+            self.assertTrue(written.wait(10))
+            yield
+        finally:
+            release.set()
+            thread.join()
+
+    @staticmethod
+    def rename(recipe):
+        recipe.name = "Новое название"
+        recipe.save()
+
+    def test_cursor_waits_for_open_transaction(self):
+        watermark = self.sync()["watermark"]
+        with self.open_transaction(lambda: self.rename(self.first)):
+            self.rename(self.second)
+            data = self.sync(watermark)
+            self.assertEqual(data["recipes"], [])
+            watermark = data["watermark"]
+        data = self.sync(watermark)
+        self.assertEqual(
+            sorted(recipe["id"] for recipe in data["recipes"]),
+            [self.first.id, self.second.id],
+        )
+
+    def test_cursor_waits_for_open_deletion(self):
+        watermark = self.sync()["watermark"]
+        first_id, second_id = self.first.id, self.second.id
+        with self.open_transaction(self.first.delete):
+            self.second.delete()
+            data = self.sync(watermark)
+            self.assertEqual(data["deleted"]["recipes"], [])
+            watermark = data["watermark"]
+        data = self.sync(watermark)
+        self.assertEqual(
+            sorted(data["deleted"]["recipes"]), [first_id, second_id]
+        )
+
+
+class ChooseEncodingTests(SimpleTestCase):
+    def test_prefers_brotli(self):
+        self.assertEqual(choose_encoding("gzip, deflate, br"), "br")
+
+    def test_zero_quality_is_refused(self):
+        self.assertEqual(choose_encoding("br;q=0, gzip"), "gzip")
+        self.assertIsNone(choose_encoding("gzip;q=0, br; q=0.0"))
+
+    def test_highest_quality_wins(self):
+        self.assertEqual(choose_encoding("br;q=0.5, gzip;q=1"), "gzip")
+
+    def test_wildcard(self):
+        self.assertEqual(choose_encoding("*"), "br")
+        self.assertEqual(choose_encoding("*;q=0, gzip"), "gzip")
+        self.assertIsNone(choose_encoding("identity"))
@@ -0,0 +1,152 @@
+import logging
+import sqlite3
+import threading
+import time
+
+from django.conf import settings
+from rest_framework.throttling import BaseThrottle, SimpleRateThrottle
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS bucket ("
+    "key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS rejected ("
+    "scope TEXT PRIMARY KEY, total INTEGER NOT NULL, last REAL NOT NULL)",
+)
+
+
+class BucketStore:
+    """Хранилище корзин токенов в общем для воркеров файле SQLite.
+
+    Каждое списание выполняется в транзакции BEGIN IMMEDIATE, поэтому
+    параллельные процессы и потоки не теряют обновления.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.local = threading.local()
+
+    @property
+    def connection(self):
+        connection = getattr(self.local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(
+                self.path, timeout=5, isolation_level=None
+            )
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            for statement in SCHEMA:
+                connection.execute(statement)
+            self.local.connection = connection
+        return connection
+
+    def take(self, key, capacity, refill_rate, now):
+        """Списывает токен; возвращает 0 или секунды до нового токена."""
+        connection = self.connection
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            row = connection.execute(
+                "SELECT tokens, updated FROM bucket WHERE key = ?", (key,)
+            ).fetchone()
+            tokens, updated = row if row else (capacity, now)
+            tokens = min(
+                capacity, tokens + max(now - updated, 0) * refill_rate
+            )
+            wait = 0 if tokens >= 1 else (1 - tokens) / refill_rate
+            if not wait:
+                tokens -= 1
+            connection.execute(
+                "INSERT INTO bucket (key, tokens, updated) VALUES (?, ?, ?) "
+                "ON CONFLICT (key) DO UPDATE "
+                "SET tokens = excluded.tokens, updated = excluded.updated",
+                (key, tokens, now),
+            )
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        return wait
+
+    def reject(self, scope, now):
+        self.connection.execute(
+            "INSERT INTO rejected (scope, total, last) VALUES (?, 1, ?) "
+            "ON CONFLICT (scope) DO UPDATE "
+            "SET total = total + 1, last = excluded.last",
+            (scope, now),
+        )
+
+    def rejections(self):
+        return self.connection.execute(
+            "SELECT scope, total, last FROM rejected ORDER BY scope"
+        ).fetchall()
+
+    def purge(self, older_than):
+        """Удаляет корзины, не обновлявшиеся дольше заданного времени."""
+        return self.connection.execute(
+            "DELETE FROM bucket WHERE updated < ?", (older_than,)
+        ).rowcount
+
+
+store = BucketStore(settings.THROTTLE_DB_PATH)
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Ограничение частоты запросов по алгоритму корзины токенов.
+
+    Частота задаётся в DEFAULT_THROTTLE_RATES как "число/период": число
+    определяет размер всплеска, а токены восполняются равномерно.
+    """
+
+    scope = None
+    timer = time.time
+
+    def __init__(self):
+        rate = settings.REST_FRAMEWORK["DEFAULT_THROTTLE_RATES"][self.scope]
+        num_requests, duration = SimpleRateThrottle.parse_rate(None, rate)
+        self.capacity = num_requests
+        self.refill_rate = num_requests / duration
+        self.wait_seconds = 0
+
+    def get_ident_key(self, request):
+        if request.user.is_authenticated:
+            return f"user:{request.user.pk}"
+        return f"ip:{self.get_ident(request)}"
+
+    def allow_request(self, request, view):
+        key = f"{self.scope}:{self.get_ident_key(request)}"
+        now = self.timer()
+        self.wait_seconds = store.take(
+            key, self.capacity, self.refill_rate, now
+        )
+        if not self.wait_seconds:
+            return True
+        store.reject(self.scope, now)
+        logger.warning("Throttled %s for %s", key, request.path)
+        return False
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class IPTokenBucketThrottle(TokenBucketThrottle):
+    """Корзина токенов по IP-адресу клиента, независимо от пользователя."""
+
+    def get_ident_key(self, request):
+        return f"ip:{self.get_ident(request)}"
+
+
+class ShoppingListUserThrottle(TokenBucketThrottle):
+    scope = "shopping_list"
+
+
+class ShoppingListIPThrottle(IPTokenBucketThrottle):
+    scope = "shopping_list_ip"
+
+
+class RecipeWriteUserThrottle(TokenBucketThrottle):
+    scope = "recipe_write"
+
+
+class RecipeWriteIPThrottle(IPTokenBucketThrottle):
+    scope = "recipe_write_ip"
@@ -5,8 +5,10 @@ from .views import (
     CustomUserViewSet,
     FavoriteRecipeViewSet,
     IngredientViewSet,
+    MealPlanViewSet,
     RecipeViewSet,
     ShoppingCartViewSet,
+    SyncView,
     TagViewSet,
 )
 
@@ -16,6 +18,7 @@ router.register("users", CustomUserViewSet, basename="users")
 router.register("ingredients", IngredientViewSet, basename="ingredients")
 router.register("tags", TagViewSet, basename="tags")
 router.register("recipes", RecipeViewSet, basename="recipes")
+router.register("meal_plans", MealPlanViewSet, basename="meal_plans")
 router.register(
     r"recipes/(?P<id>\d+)/favorite", FavoriteRecipeViewSet, basename="favorite"
 )
@@ -26,6 +29,7 @@ router.register(
 )
 
 urlpatterns = [
+    path("sync/", SyncView.as_view(), name="sync"),
     path("", include(router.urls)),
     path("", include("djoser.urls")),
     path("auth/", include("djoser.urls.authtoken")),
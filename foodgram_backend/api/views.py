@@ -1,46 +1,162 @@
 from datetime import datetime
 
-from django.db.models import Sum
+from django.conf import settings
+from django.core import signing
+from django.db.models import Exists, F, FloatField, OuterRef, Sum
 from django.http import HttpResponse
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet
 from rest_framework import mixins, status, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import SAFE_METHODS, IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.views import APIView
 
+from recipes import deletion, facets, sync, trending
 from recipes.models import (
     FavoriteRecipe,
     Ingredient,
     IngredientsRecipe,
+    MealPlanItem,
     Recipe,
     ShoppingCart,
     Tag,
 )
+from recipes.similarity import similar_recipes
+from recipes.units import aggregate
 from users.models import Subscribe, User
 
 from .filters import IngredientFilter, RecipeFilter
+from .pagination import FeedPagination
 from .permission import AuthorOrReadOnly
+from .replicas import ReplicaReadMixin
 from .serializers import (
     CustomUserSerializer,
     FavoriteRecipeSerializer,
     IngredientSerializer,
+    MealPlanSerializer,
     RecipeCreateSerializer,
     RecipeGetSerializer,
+    RecipeShowSerializer,
     ShoppingCartSerializer,
     SubscribeSerializer,
     TagSerializer,
+    sparse_fields,
 )
+from .throttles import (
+    RecipeWriteIPThrottle,
+    RecipeWriteUserThrottle,
+    ShoppingListIPThrottle,
+    ShoppingListUserThrottle,
+)
+
+FACETS_IGNORED_PARAMS = (
+    "page",
+    "limit",
+    "ordering",
+    "count",
+    "fields",
+    "omit",
+)
+FACETS_USER_PARAMS = ("is_favorited", "is_in_shopping_cart")
+
+
+def parse_ids(value):
+    """Список уникальных id из параметра вида 1,2,3 с сохранением порядка."""
+    try:
+        ids = list(dict.fromkeys(int(pk) for pk in value.split(",") if pk))
+    except ValueError:
+        raise ValidationError({"ids": "Укажите id через запятую."})
+    if not ids or len(ids) > settings.MAX_BATCH_IDS:
+        raise ValidationError(
+            {"ids": f"Можно запросить от 1 до {settings.MAX_BATCH_IDS} id."}
+        )
+    return ids
+
+
+def recipe_read_queryset(queryset, request):
+    """Документы рецептов и отметки пользователя под запрошенные поля."""
+    fields = sparse_fields(request, RecipeGetSerializer.Meta.fields)
+    queryset = queryset.select_related("document").only(
+        "id", "pub_date", "updated_at", "document__data"
+    )
+    user = request.user
+    if not user.is_authenticated:
+        return queryset
+    for field, name, model in (
+        ("is_favorited", "favorited", FavoriteRecipe),
+        ("is_in_shopping_cart", "in_shopping_cart", ShoppingCart),
+    ):
+        if field in fields:
+            queryset = queryset.annotate(
+                **{
+                    name: Exists(
+                        model.objects.filter(user=user, recipe=OuterRef("pk"))
+                    )
+                }
+            )
+    return queryset
+
+
+def shopping_cart_ingredients(user):
+    """Суммы ингредиентов из корзины: (название, единица, количество)"""
+    return (
+        IngredientsRecipe.objects.filter(recipe__shopping_cart__user=user)
+        .values("ingredient__name", "ingredient__measurement_unit")
+        .annotate(sum_amount=Sum("amount"))
+        .values_list(
+            "ingredient__name",
+            "ingredient__measurement_unit",
+            "sum_amount",
+        )
+    )
 
 
-class CustomUserViewSet(UserViewSet):
+def shopping_list_response(user, ingredients):
+    """Текстовый файл списка покупок из строк (название, единица, сумма)"""
+    today = datetime.today()
+    shopping_list = (
+        f"Список покупок для: {user.get_full_name()}\n\n"
+        f"Дата создания: {today:%Y-%m-%d}\n\n"
+    )
+    shopping_list += "\n".join(
+        [
+            f"- {name} ({unit}) - {amount}"
+            for name, unit, amount in aggregate(ingredients)
+        ]
+    )
+    shopping_list += f"\n\nПриятного аппетита! (© FoodGram {today:%Y})"
+
+    filename = f"{user.username}_shopping_list.txt"
+    response = HttpResponse(shopping_list, content_type="text/plain")
+    response["Content-Disposition"] = f"attachment; filename={filename}"
+
+    return response
+
+
+class CustomUserViewSet(ReplicaReadMixin, UserViewSet):
     """Вьюсет для пользователя и подписок"""
 
     queryset = User.objects.all()
     serializer_class = CustomUserSerializer
     permission_classes = (AuthorOrReadOnly,)
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        user = self.request.user
+        if user.is_authenticated:
+            queryset = queryset.annotate(
+                subscribed=Exists(
+                    Subscribe.objects.filter(user=user, author=OuterRef("pk"))
+                )
+            )
+        return queryset
+
+    def perform_destroy(self, instance):
+        deletion.schedule_user_deletion(instance)
+
     @action(
         detail=True,
         methods=("post", "delete"),
@@ -66,7 +182,10 @@ class CustomUserViewSet(UserViewSet):
     @action(detail=False, permission_classes=(IsAuthenticated,))
     def subscriptions(self, request):
         user = request.user
-        queryset = User.objects.filter(subscribing__user=user)
+        queryset = (
+            User.objects.filter(subscribing__user=user)
+            .prefetch_related("recipes")
+        )
         pages = self.paginate_queryset(queryset)
         serializer = SubscribeSerializer(
             pages, many=True, context={"request": request}
@@ -74,7 +193,7 @@ class CustomUserViewSet(UserViewSet):
         return self.get_paginated_response(serializer.data)
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(ReplicaReadMixin, viewsets.ReadOnlyModelViewSet):
     """Вьюсет для ингридиентов"""
 
     queryset = Ingredient.objects.all()
@@ -84,7 +203,7 @@ class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     pagination_class = None
 
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+class TagViewSet(ReplicaReadMixin, viewsets.ReadOnlyModelViewSet):
     """Вьюсет для тегов"""
 
     queryset = Tag.objects.all()
@@ -92,7 +211,7 @@ class TagViewSet(viewsets.ReadOnlyModelViewSet):
     pagination_class = None
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
     """Вьюсет для рецептов"""
 
     queryset = Recipe.objects.all()
@@ -109,48 +228,101 @@ class RecipeViewSet(viewsets.ModelViewSet):
         return serializer.save()
 
     def get_serializer_class(self):
-        if self.action in SAFE_METHODS:
+        if self.request.method in SAFE_METHODS:
             return RecipeGetSerializer
         return RecipeCreateSerializer
 
-    @action(detail=False, permission_classes=(IsAuthenticated,))
-    def download_shopping_cart(self, request):
-        user = request.user
-        if not user.shopping_cart.exists():
-            return Response(status=status.HTTP_400_BAD_REQUEST)
+    def list(self, request, *args, **kwargs):
+        if "ids" not in request.query_params:
+            return super().list(request, *args, **kwargs)
+        ids = parse_ids(request.query_params["ids"])
+        recipes = self.filter_queryset(self.get_queryset()).in_bulk(ids)
+        serializer = self.get_serializer(
+            [recipes[pk] for pk in ids if pk in recipes], many=True
+        )
+        return Response(serializer.data)
 
-        ingredients = (
-            IngredientsRecipe.objects.filter(
-                recipe__shopping_cart__user=request.user
-            )
-            .values("ingredient__name", "ingredient__measurement_unit")
-            .annotate(sum_amount=Sum("amount"))
+    def get_throttles(self):
+        if self.action in ("create", "partial_update"):
+            return [RecipeWriteUserThrottle(), RecipeWriteIPThrottle()]
+        return super().get_throttles()
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.request.method not in SAFE_METHODS:
+            return queryset
+        return recipe_read_queryset(queryset, self.request)
+
+    def perform_destroy(self, instance):
+        deletion.delete_recipes([instance.id])
+
+    @action(
+        detail=False,
+        permission_classes=(IsAuthenticated,),
+        pagination_class=FeedPagination,
+    )
+    def feed(self, request):
+        ids = self.paginator.paginate_feed(request.user, request)
+        recipes = self.get_queryset().in_bulk(ids)
+        serializer = RecipeGetSerializer(
+            [recipes[pk] for pk in ids if pk in recipes],
+            many=True,
+            context={"request": request},
         )
+        return self.get_paginated_response(serializer.data)
 
-        today = datetime.today()
-        shopping_list = (
-            f"Список покупок для: {user.get_full_name()}\n\n"
-            f"Дата создания: {today:%Y-%m-%d}\n\n"
+    @action(detail=False)
+    def trending(self, request):
+        queryset = self.get_queryset().order_by(
+            "-trending_score", "-pub_date"
         )
-        shopping_list += "\n".join(
-            [
-                f'- {ingredient["ingredient__name"]} '
-                f'({ingredient["ingredient__measurement_unit"]})'
-                f' - {ingredient["sum_amount"]}'
-                for ingredient in ingredients
-            ]
+        pages = self.paginate_queryset(queryset)
+        serializer = RecipeGetSerializer(
+            pages, many=True, context={"request": request}
         )
-        shopping_list += f"\n\nПриятного аппетита! (© FoodGram {today:%Y})"
+        return self.get_paginated_response(serializer.data)
 
-        filename = f"{user.username}_shopping_list.txt"
-        response = HttpResponse(shopping_list, content_type="text/plain")
-        response["Content-Disposition"] = f"attachment; filename={filename}"
+    @action(detail=False)
+    def facets(self, request):
+        params = [
+            (name, values)
+            for name, values in request.query_params.lists()
+            if name not in FACETS_IGNORED_PARAMS
+        ]
+        user = None
+        if request.user.is_authenticated and any(
+            name in request.query_params for name in FACETS_USER_PARAMS
+        ):
+            user = request.user
+        queryset = self.filter_queryset(Recipe.objects.all())
+        return Response(facets.get_facets(queryset, params, user))
+
+    @action(detail=True)
+    def similar(self, request, pk=None):
+        recipes = similar_recipes(self.get_object())
+        serializer = RecipeShowSerializer(
+            recipes, many=True, context={"request": request}
+        )
+        return Response(serializer.data)
+
+    @action(
+        detail=False,
+        permission_classes=(IsAuthenticated,),
+        throttle_classes=(ShoppingListUserThrottle, ShoppingListIPThrottle),
+    )
+    def download_shopping_cart(self, request):
+        user = request.user
+        if not user.shopping_cart.exists():
+            return Response(status=status.HTTP_400_BAD_REQUEST)
 
-        return response
+        return shopping_list_response(user, shopping_cart_ingredients(user))
 
 
 class ShoppingCartViewSet(
-    mixins.DestroyModelMixin, mixins.CreateModelMixin, viewsets.GenericViewSet
+    ReplicaReadMixin,
+    mixins.DestroyModelMixin,
+    mixins.CreateModelMixin,
+    viewsets.GenericViewSet,
 ):
     """Вьюсет для списка покупок"""
 
@@ -176,7 +348,10 @@ class ShoppingCartViewSet(
 
 
 class FavoriteRecipeViewSet(
-    mixins.DestroyModelMixin, mixins.CreateModelMixin, viewsets.GenericViewSet
+    ReplicaReadMixin,
+    mixins.DestroyModelMixin,
+    mixins.CreateModelMixin,
+    viewsets.GenericViewSet,
 ):
     """Вьюсет для избранного"""
 
@@ -200,3 +375,111 @@ class FavoriteRecipeViewSet(
             "Такого рецепта нет в избранном",
             status=status.HTTP_400_BAD_REQUEST,
         )
+
+
+class MealPlanViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
+    """Вьюсет для планов питания"""
+
+    serializer_class = MealPlanSerializer
+    permission_classes = (IsAuthenticated,)
+    http_method_names = ["get", "post", "patch", "delete"]
+
+    def get_queryset(self):
+        return self.request.user.meal_plans.prefetch_related("items__recipe")
+
+    @action(
+        detail=True,
+        throttle_classes=(ShoppingListUserThrottle, ShoppingListIPThrottle),
+    )
+    def download_shopping_cart(self, request, pk=None):
+        plan = self.get_object()
+        ingredients = (
+            MealPlanItem.objects.filter(plan=plan)
+            .values(
+                "recipe__ingredients_recipe__ingredient__name",
+                "recipe__ingredients_recipe__ingredient__measurement_unit",
+            )
+            .annotate(
+                sum_amount=Sum(
+                    F("recipe__ingredients_recipe__amount") * F("servings"),
+                    output_field=FloatField(),
+                )
+            )
+        )
+        return shopping_list_response(
+            request.user,
+            ingredients.values_list(
+                "recipe__ingredients_recipe__ingredient__name",
+                "recipe__ingredients_recipe__ingredient__measurement_unit",
+                "sum_amount",
+            ),
+        )
+
+    @action(detail=True, methods=("post",))
+    def shopping_cart(self, request, pk=None):
+        plan = self.get_object()
+        recipe_ids = set(
+            plan.items.exclude(
+                recipe__shopping_cart__user=request.user
+            ).values_list("recipe_id", flat=True)
+        )
+        ShoppingCart.objects.bulk_create(
+            (
+                ShoppingCart(user=request.user, recipe_id=recipe_id)
+                for recipe_id in recipe_ids
+            ),
+            ignore_conflicts=True,
+        )
+        trending.bump(recipe_ids, trending.SHOPPING_CART_WEIGHT)
+        # bulk_create не отправляет сигналов, поэтому поколение фасетов
+        # пользователя сдвигается явно.
+        facets.bump_generation(
+            facets.USER_GENERATION_KEY.format(request.user.pk)
+        )
+        return Response(
+            {"added": len(recipe_ids)}, status=status.HTTP_201_CREATED
+        )
+
+
+class SyncView(APIView):
+    """Изменения рецептов, тегов и ингредиентов после водяного знака.
+
+    Читает с основной базы: граница sync.settled_until считается по её
+    транзакциям, а отставшая реплика позволила бы курсору обогнать строки.
+    """
+
+    def get(self, request):
+        try:
+            cursors = sync.decode(request.query_params.get("since"))
+        except signing.BadSignature:
+            raise ValidationError({"since": "Недействительный водяной знак."})
+        except sync.WatermarkExpired:
+            return Response(
+                {"detail": "Водяной знак устарел, выполните полную загрузку."},
+                status=status.HTTP_410_GONE,
+            )
+        limit = request.query_params.get("limit", settings.SYNC_PAGE_SIZE)
+        try:
+            limit = min(int(limit), settings.SYNC_MAX_PAGE_SIZE)
+        except ValueError:
+            raise ValidationError({"limit": "Укажите целое число."})
+        context = {"request": request}
+        changed, deleted, cursors, has_more = sync.changes(
+            cursors,
+            max(limit, 1),
+            {"recipes": recipe_read_queryset(Recipe.objects.all(), request)},
+        )
+        return Response(
+            {
+                "recipes": RecipeGetSerializer(
+                    changed["recipes"], many=True, context=context
+                ).data,
+                "tags": TagSerializer(changed["tags"], many=True).data,
+                "ingredients": IngredientSerializer(
+                    changed["ingredients"], many=True
+                ).data,
+                "deleted": deleted,
+                "watermark": sync.encode(cursors),
+                "has_more": has_more,
+            }
+        )
@@ -0,0 +1,39 @@
+"""Бенчмарки на детерминированном наборе данных в памяти.
+
+Запуск из каталога foodgram_backend: ``python -m benchmarks.<имя>``.
+"""
+import os
+import time
+
+
+def setup(users=200, recipes=2000, seed=42):
+    """Настраивает Django на SQLite в памяти и заполняет базу."""
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "benchmarks.settings")
+    import django
+
+    django.setup()
+    from django.core.management import call_command
+
+    call_command("migrate", verbosity=0)
+    call_command("load_csv", verbosity=0)
+    call_command(
+        "seed_data",
+        users=users,
+        recipes=recipes,
+        favorites=recipes * 4,
+        carts=recipes,
+        subscriptions=users * 5,
+        seed=seed,
+        verbosity=0,
+    )
+    call_command("render_documents", verbosity=0)
+
+
+def timeit(func, repeat=5):
+    """Лучшее время выполнения функции в секундах."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
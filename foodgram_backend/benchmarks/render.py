@@ -0,0 +1,68 @@
+"""Время рендеринга JSON и размер ответа для основных эндпоинтов."""
+import argparse
+
+from benchmarks import setup, timeit
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--recipes", type=int, default=2000)
+    parser.add_argument("--limit", type=int, default=50)
+    args = parser.parse_args()
+    setup(recipes=args.recipes)
+
+    from django.conf import settings
+    from django.utils.text import compress_string
+    from rest_framework.renderers import JSONRenderer
+    from rest_framework.test import APIRequestFactory
+
+    from api.middleware import brotli
+    from api.renderers import FastJSONRenderer
+    from api.views import IngredientViewSet, RecipeViewSet
+    from recipes.models import Recipe
+
+    factory = APIRequestFactory()
+    recipe_id = Recipe.objects.values_list("id", flat=True).first()
+    endpoints = {
+        "recipes list": (
+            RecipeViewSet.as_view({"get": "list"}),
+            factory.get("/api/recipes/", {"limit": args.limit}),
+            {},
+        ),
+        "recipes detail": (
+            RecipeViewSet.as_view({"get": "retrieve"}),
+            factory.get(f"/api/recipes/{recipe_id}/"),
+            {"pk": recipe_id},
+        ),
+        "ingredients": (
+            IngredientViewSet.as_view({"get": "list"}),
+            factory.get("/api/ingredients/"),
+            {},
+        ),
+    }
+    renderers = {"json": JSONRenderer(), "orjson": FastJSONRenderer()}
+
+    print(
+        f"{'эндпоинт':16} {'json, мс':>9} {'orjson, мс':>11} "
+        f"{'байт':>9} {'gzip':>8} {'br':>8}"
+    )
+    for name, (view, request, kwargs) in endpoints.items():
+        data = view(request, **kwargs).data
+        times = {
+            key: timeit(lambda: renderer.render(data)) * 1000
+            for key, renderer in renderers.items()
+        }
+        raw = renderers["orjson"].render(data)
+        compressed = (
+            len(brotli.compress(raw, quality=settings.BROTLI_QUALITY))
+            if brotli
+            else 0
+        )
+        print(
+            f"{name:16} {times['json']:9.2f} {times['orjson']:11.2f} "
+            f"{len(raw):9} {len(compress_string(raw)):8} {compressed:8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Нагрузочный тест запущенного сервера.
+
+Сравнение профилей: запустите gunicorn с разными настройками и
+прогоните один и тот же сценарий, например::
+
+    GUNICORN_WORKER_CLASS=sync DB_CONN_MAX_AGE=0 gunicorn -c gunicorn.conf.py foodgram_backend.wsgi
+    python -m benchmarks.server --url http://127.0.0.1:8000/api/recipes/
+
+    GUNICORN_WORKER_CLASS=gthread DB_CONN_MAX_AGE=60 gunicorn -c gunicorn.conf.py foodgram_backend.wsgi
+    python -m benchmarks.server --url http://127.0.0.1:8000/api/recipes/
+
+Запускайте на PostgreSQL с его max_connections и параллелизмом выше
+числа потоков: только так видно, укладываются ли воркеры в бюджет
+соединений GUNICORN_DB_CONNECTIONS.
+"""  # noqa: E501
+import argparse
+import statistics
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+
+def worker(url, deadline):
+    latencies, errors = [], 0
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(url, timeout=30) as response:
+                response.read()
+        except OSError:
+            errors += 1
+            continue
+        latencies.append(time.perf_counter() - start)
+    return latencies, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Нагрузочный тест запущенного сервера"
+    )
+    parser.add_argument("--url", required=True)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=20)
+    args = parser.parse_args()
+
+    deadline = time.perf_counter() + args.duration
+    with ThreadPoolExecutor(args.concurrency) as executor:
+        results = list(
+            executor.map(
+                lambda _: worker(args.url, deadline),
+                range(args.concurrency),
+            )
+        )
+    latencies = sorted(value for values, _ in results for value in values)
+    errors = sum(count for _, count in results)
+    if not latencies:
+        print(f"нет успешных запросов, ошибок: {errors}")
+        return
+    quantiles = statistics.quantiles(latencies, n=100)
+    print(f"запросов: {len(latencies)}, ошибок: {errors}")
+    print(f"RPS: {len(latencies) / args.duration:.1f}")
+    print(
+        f"p50: {quantiles[49] * 1000:.1f} мс, "
+        f"p95: {quantiles[94] * 1000:.1f} мс, "
+        f"p99: {quantiles[98] * 1000:.1f} мс"
+    )
+
+
+if __name__ == "__main__":
+    main()
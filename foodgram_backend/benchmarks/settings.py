@@ -0,0 +1,17 @@
+import os
+import tempfile
+
+from foodgram_backend.settings import *  # noqa: F401,F403
+
+DATABASES = {
+    "default": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": ":memory:",
+    }
+}
+
+ALLOWED_HOSTS = ["testserver"]
+
+JOBS_EAGER = True
+
+MEDIA_ROOT = os.path.join(tempfile.gettempdir(), "foodgram-benchmarks")
@@ -0,0 +1,77 @@
+"""Сравнение MinHash/LSH с точным перебором по коэффициенту Жаккара."""
+import argparse
+import time
+
+from benchmarks import setup, timeit
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--recipes", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+    setup(recipes=args.recipes)
+
+    from recipes import similarity
+    from recipes.models import IngredientsRecipe, Recipe
+
+    def load_sets():
+        sets = {}
+        for recipe_id, ingredient_id in IngredientsRecipe.objects.values_list(
+            "recipe_id", "ingredient_id"
+        ):
+            sets.setdefault(recipe_id, set()).add(ingredient_id)
+        return sets
+
+    def exact(sets, recipe_id):
+        target = sets[recipe_id]
+        scores = (
+            (len(target & other) / len(target | other), other_id)
+            for other_id, other in sets.items()
+            if other_id != recipe_id
+        )
+        return [pk for _, pk in sorted(scores, reverse=True)[: args.limit]]
+
+    build_lsh = timeit(similarity.build, repeat=1)
+    build_exact = timeit(load_sets, repeat=1)
+    sets = load_sets()
+    queries = list(
+        Recipe.objects.order_by("?").values_list("id", flat=True)[
+            : args.queries
+        ]
+    )
+    recipes = Recipe.objects.in_bulk(queries)
+
+    start = time.perf_counter()
+    lsh_results = {
+        pk: [recipe.id for recipe in similarity.similar_recipes(recipes[pk])]
+        for pk in queries
+    }
+    lsh_latency = (time.perf_counter() - start) / len(queries)
+
+    start = time.perf_counter()
+    exact_results = {pk: exact(sets, pk) for pk in queries}
+    exact_latency = (time.perf_counter() - start) / len(queries)
+
+    def jaccard(recipe_id, other_id):
+        return len(sets[recipe_id] & sets[other_id]) / len(
+            sets[recipe_id] | sets[other_id]
+        )
+
+    quality = sum(
+        sum(jaccard(pk, other) for other in lsh_results[pk])
+        / max(sum(jaccard(pk, other) for other in exact_results[pk]), 1e-9)
+        for pk in queries
+    ) / len(queries)
+
+    print(f"рецептов: {len(sets)}, запросов: {len(queries)}")
+    print(f"построение LSH:   {build_lsh * 1000:10.1f} мс")
+    print(f"загрузка наборов: {build_exact * 1000:10.1f} мс")
+    print(f"запрос LSH:       {lsh_latency * 1000:10.2f} мс")
+    print(f"запрос точный:    {exact_latency * 1000:10.2f} мс")
+    print(f"сумма Жаккара LSH/точный: {quality:.2%}")
+
+
+if __name__ == "__main__":
+    main()
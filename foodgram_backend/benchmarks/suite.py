@@ -0,0 +1,402 @@
+"""Микробенчмарки сериализаторов, фильтров и списка покупок.
+
+Пропускная способность зависит от машины и версии Python, поэтому база
+для сравнения измеряется в том же запуске: версия из git-ссылки
+прогоняется в отдельном рабочем дереве, затем текущая::
+
+    python -m benchmarks.suite --baseline-ref origin/main
+
+Результаты можно сохранить и сравнить с ними позже, но только на той же
+машине и том же интерпретаторе::
+
+    python -m benchmarks.suite --save /tmp/baseline.json
+    python -m benchmarks.suite --compare /tmp/baseline.json
+
+В режиме сравнения команда завершается с ошибкой, если пропускная
+способность хотя бы одного бенчмарка упала больше чем на --tolerance.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+
+from benchmarks import setup, timeit
+
+BENCHMARKS = {}
+FILTERS = {
+    "tags": {"tags": ["breakfast", "lunch"]},
+    "author": None,
+    "is_favorited": {"is_favorited": "1"},
+    "is_in_shopping_cart": {"is_in_shopping_cart": "1"},
+    "calories": {"calories_max": "2000"},
+    "ordering": {"ordering": "-trending"},
+}
+
+
+def benchmark(func):
+    """Регистрирует бенчмарк.
+
+    Функция готовит данные и возвращает пару (замеряемая функция,
+    число обработанных объектов за вызов).
+    """
+    BENCHMARKS[func.__name__] = func
+    return func
+
+
+class Context:
+    """Общие для бенчмарков пользователь, запрос и выборки."""
+
+    def __init__(self, limit):
+        from rest_framework.request import Request
+        from rest_framework.test import APIRequestFactory
+
+        from users.models import User
+
+        self.limit = limit
+        self.user = (
+            User.objects.filter(shopping_cart__isnull=False)
+            .order_by("id")
+            .first()
+        )
+        self.request = Request(APIRequestFactory().get("/api/recipes/"))
+        self.request.user = self.user
+
+    def serializer_context(self):
+        return {"request": self.request}
+
+
+@benchmark
+def recipe_get_serializer(context):
+    from api.serializers import RecipeGetSerializer
+    from api.views import recipe_read_queryset
+    from recipes.models import Recipe
+
+    recipes = list(
+        recipe_read_queryset(Recipe.objects.all(), context.request)[
+            : context.limit
+        ]
+    )
+
+    def run():
+        return RecipeGetSerializer(
+            recipes, many=True, context=context.serializer_context()
+        ).data
+
+    return run, len(recipes)
+
+
+@benchmark
+def subscribe_serializer(context):
+    from api.serializers import SubscribeSerializer
+    from users.models import User
+
+    authors = list(
+        User.objects.filter(recipes__isnull=False)
+        .distinct()
+        .prefetch_related("recipes")[: context.limit]
+    )
+
+    def run():
+        return SubscribeSerializer(
+            authors, many=True, context=context.serializer_context()
+        ).data
+
+    return run, len(authors)
+
+
+def recipe_payload():
+    import base64
+    import io
+
+    from PIL import Image
+
+    from recipes.models import Ingredient, Tag
+
+    buffer = io.BytesIO()
+    Image.new("RGB", (8, 8), (200, 100, 50)).save(buffer, "PNG")
+    image = base64.b64encode(buffer.getvalue()).decode()
+    return {
+        "ingredients": [
+            {"id": pk, "amount": 10}
+            for pk in Ingredient.objects.order_by("id").values_list(
+                "id", flat=True
+            )[:10]
+        ],
+        "tags": list(Tag.objects.values_list("id", flat=True)[:2]),
+        "image": f"data:image/png;base64,{image}",
+        "name": "Бенчмарк",
+        "text": "Описание",
+        "cooking_time": 30,
+    }
+
+
+@benchmark
+def recipe_create_validate(context):
+    from api.serializers import RecipeCreateSerializer
+
+    payload = recipe_payload()
+
+    def run():
+        serializer = RecipeCreateSerializer(
+            data=payload, context=context.serializer_context()
+        )
+        serializer.is_valid(raise_exception=True)
+
+    return run, 1
+
+
+@benchmark
+def recipe_create(context):
+    from django.db import transaction
+
+    from api.serializers import RecipeCreateSerializer
+
+    payload = recipe_payload()
+
+    def run():
+        with transaction.atomic():
+            serializer = RecipeCreateSerializer(
+                data=payload, context=context.serializer_context()
+            )
+            serializer.is_valid(raise_exception=True)
+            serializer.save()
+            transaction.set_rollback(True)
+
+    return run, 1
+
+
+def filter_benchmark(name, params):
+    def prepare(context):
+        from api.filters import RecipeFilter
+        from recipes.models import Recipe
+
+        data = params or {"author": str(context.user.id)}
+
+        def run():
+            queryset = RecipeFilter(
+                data, queryset=Recipe.objects.all(), request=context.request
+            ).qs
+            return list(queryset.values_list("id", flat=True)[: context.limit])
+
+        return run, 1
+
+    prepare.__name__ = f"recipe_filter_{name}"
+    return benchmark(prepare)
+
+
+for filter_name, filter_params in FILTERS.items():
+    filter_benchmark(filter_name, filter_params)
+
+
+@benchmark
+def shopping_list(context):
+    from api.views import shopping_cart_ingredients, shopping_list_response
+
+    def run():
+        return shopping_list_response(
+            context.user, shopping_cart_ingredients(context.user)
+        )
+
+    return run, 1
+
+
+def measure(names, limit, repeat):
+    context = Context(limit)
+    results = {}
+    for name in names:
+        run, items = BENCHMARKS[name](context)
+        run()
+        seconds = timeit(run, repeat=repeat)
+        results[name] = {
+            "seconds": round(seconds, 6),
+            "ops_per_second": round(items / seconds, 1),
+        }
+    return results
+
+
+def compare(baseline, results, tolerance):
+    """Печатает сравнение и возвращает имена регрессировавших бенчмарков."""
+    regressions = []
+    print(f"{'бенчмарк':34} {'база, оп/с':>12} {'сейчас':>12} {'изм.':>8}")
+    for name, current in results.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f"{name:34} {'—':>12} {current['ops_per_second']:12.1f}")
+            continue
+        change = current["ops_per_second"] / base["ops_per_second"] - 1
+        mark = ""
+        if change < -tolerance:
+            regressions.append(name)
+            mark = "  регрессия"
+        print(
+            f"{name:34} {base['ops_per_second']:12.1f} "
+            f"{current['ops_per_second']:12.1f} {change:+8.1%}{mark}"
+        )
+    return regressions
+
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+    }
+
+
+def run_suite(cwd, options, output):
+    """Прогоняет бенчмарки отдельным процессом в каталоге cwd."""
+    subprocess.run(
+        [sys.executable, "-m", "benchmarks.suite", *options]
+        + ["--save", output],
+        cwd=cwd,
+        check=True,
+        stdout=subprocess.DEVNULL,
+    )
+    with open(output, encoding="utf-8") as results_file:
+        return json.load(results_file)["results"]
+
+
+def best(runs):
+    """Лучший результат каждого бенчмарка из нескольких прогонов."""
+    merged = {}
+    for run in runs:
+        for name, result in run.items():
+            current = merged.get(name)
+            if current is None or result["seconds"] < current["seconds"]:
+                merged[name] = result
+    return merged
+
+
+def measure_against_ref(ref, options, rounds):
+    """Результаты версии ref и текущей версии, измеренные поочерёдно.
+
+    Версия ref разворачивается во временном рабочем дереве git. Обе
+    версии запускаются отдельными процессами rounds раз по очереди, и от
+    каждой берётся лучший результат: прогрев машины и фоновые помехи
+    достаются обеим поровну.
+    """
+    prefix = subprocess.run(
+        ["git", "rev-parse", "--show-prefix"],
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout.strip()
+    with tempfile.TemporaryDirectory() as directory:
+        tree = os.path.join(directory, "tree")
+        output = os.path.join(directory, "results.json")
+        subprocess.run(
+            ["git", "worktree", "add", "--detach", tree, ref],
+            check=True,
+            stdout=subprocess.DEVNULL,
+        )
+        baseline_runs, current_runs = [], []
+        try:
+            for _ in range(rounds):
+                baseline_runs.append(
+                    run_suite(os.path.join(tree, prefix), options, output)
+                )
+                current_runs.append(run_suite(os.getcwd(), options, output))
+        finally:
+            subprocess.run(
+                ["git", "worktree", "remove", "--force", tree], check=True
+            )
+    return best(baseline_runs), best(current_runs)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--recipes", type=int, default=2000)
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument(
+        "--only", nargs="+", choices=sorted(BENCHMARKS), metavar="NAME"
+    )
+    parser.add_argument("--save", metavar="PATH")
+    baseline_source = parser.add_mutually_exclusive_group()
+    baseline_source.add_argument("--compare", metavar="PATH")
+    baseline_source.add_argument(
+        "--baseline-ref",
+        metavar="REF",
+        help="Git-ссылка, чья версия измеряется как база в этом же запуске",
+    )
+    parser.add_argument(
+        "--rounds",
+        type=int,
+        default=3,
+        help="Сколько раз по очереди прогнать базу и текущую версию",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="Допустимое падение пропускной способности, доля",
+    )
+    args = parser.parse_args()
+
+    dataset = {
+        "users": args.users,
+        "recipes": args.recipes,
+        "limit": args.limit,
+    }
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as baseline_file:
+            recorded = json.load(baseline_file)
+        environments = {name: recorded.get(name) for name in environment()}
+        if environments != environment():
+            sys.exit(
+                f"База записана в другом окружении ({environments}, сейчас "
+                f"{environment()}): используйте --baseline-ref"
+            )
+        baseline = recorded["results"]
+        dataset = recorded["dataset"]
+
+    if args.baseline_ref:
+        options = [
+            f"--users={args.users}",
+            f"--recipes={args.recipes}",
+            f"--limit={args.limit}",
+            f"--repeat={args.repeat}",
+        ]
+        if args.only:
+            options += ["--only", *args.only]
+        baseline, results = measure_against_ref(
+            args.baseline_ref, options, args.rounds
+        )
+    else:
+        setup(users=dataset["users"], recipes=dataset["recipes"])
+        results = measure(
+            args.only or list(BENCHMARKS), dataset["limit"], args.repeat
+        )
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as baseline_file:
+            json.dump(
+                {"dataset": dataset, "results": results, **environment()},
+                baseline_file,
+                ensure_ascii=False,
+                indent=2,
+                sort_keys=True,
+            )
+            baseline_file.write("\n")
+
+    if baseline is None:
+        print(f"{'бенчмарк':34} {'мс':>10} {'оп/с':>12}")
+        for name, result in results.items():
+            print(
+                f"{name:34} {result['seconds'] * 1000:10.3f} "
+                f"{result['ops_per_second']:12.1f}"
+            )
+        return
+    regressions = compare(baseline, results, args.tolerance)
+    if regressions:
+        sys.exit(f"Регрессия: {', '.join(regressions)}")
+
+
+if __name__ == "__main__":
+    main()
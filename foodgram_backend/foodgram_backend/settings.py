@@ -24,10 +24,12 @@ INSTALLED_APPS = [
     "users.apps.UsersConfig",
     "recipes.apps.RecipesConfig",
     "api.apps.ApiConfig",
+    "jobs.apps.JobsConfig",
 ]
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "api.middleware.CompressionMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -58,15 +60,36 @@ WSGI_APPLICATION = "foodgram_backend.wsgi.application"
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': os.getenv('DB_ENGINE', 'django.db.backends.postgresql'),
         'NAME': os.getenv('POSTGRES_DB', 'django'),
         'USER': os.getenv('POSTGRES_USER', 'django'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
         'HOST': os.getenv('DB_HOST', ''),
         'PORT': os.getenv('DB_PORT', 5432),
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 60)),
     }
 }
 
+# Хосты реплик PostgreSQL (для SQLite - пути к файлам) через пробел.
+DATABASE_REPLICAS = []
+REPLICA_KEY = 'NAME' if 'sqlite' in DATABASES['default']['ENGINE'] else 'HOST'
+for number, replica in enumerate(os.getenv('DB_REPLICAS', '').split()):
+    alias = f'replica_{number}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        REPLICA_KEY: replica,
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['api.replicas.ReplicaRouter']
+
+REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', 5))
+
+DB_CONN_HEALTH_CHECKS = (
+    os.getenv('DB_CONN_HEALTH_CHECKS', 'True').lower() == 'true'
+)
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         "NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator",
@@ -95,12 +118,27 @@ USE_TZ = True
 STATIC_URL = "/static/"
 STATIC_ROOT = BASE_DIR / 'collected_static'
 
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        "LOCATION": os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 MEDIA_URL = "/media/"
 MEDIA_ROOT = '/media'
 
+DEFAULT_FILE_STORAGE = "recipes.storage.ContentAddressedStorage"
+
 REST_FRAMEWORK = {
+    "DEFAULT_RENDERER_CLASSES": [
+        "api.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.AllowAny",
     ],
@@ -109,6 +147,13 @@ REST_FRAMEWORK = {
     ],
     "DEFAULT_PAGINATION_CLASS": "api.pagination.CustomPagination",
     "PAGE_SIZE": 6,
+    "DEFAULT_THROTTLE_RATES": {
+        "shopping_list": os.getenv('THROTTLE_SHOPPING_LIST', '10/min'),
+        "shopping_list_ip": os.getenv('THROTTLE_SHOPPING_LIST_IP', '30/min'),
+        "recipe_write": os.getenv('THROTTLE_RECIPE_WRITE', '20/hour'),
+        "recipe_write_ip": os.getenv('THROTTLE_RECIPE_WRITE_IP', '60/hour'),
+    },
+    "NUM_PROXIES": int(os.getenv('NUM_PROXIES', 1)),
 }
 
 AUTH_USER_MODEL = "users.User"
@@ -124,3 +169,46 @@ DJOSER = {
     },
     "HIDE_USERS": False,
 }
+
+FEED_FANOUT_MAX_SUBSCRIBERS = int(
+    os.getenv('FEED_FANOUT_MAX_SUBSCRIBERS', 10000)
+)
+FEED_POPULAR_AUTHORS_TTL = 600
+FEED_BACKFILL_SIZE = 50
+
+TRENDING_HALF_LIFE_HOURS = 72
+
+EXACT_COUNT_THRESHOLD = 10000
+ESTIMATED_COUNT_TTL = 300
+
+COMPRESSION_MIN_SIZE = 1024
+BROTLI_QUALITY = 5
+
+THROTTLE_DB_PATH = os.getenv('THROTTLE_DB_PATH', '/tmp/foodgram-throttle.db')
+
+JOBS_EAGER = False
+JOBS_MAX_ATTEMPTS = 5
+JOBS_BACKOFF_SECONDS = 10
+JOBS_BACKOFF_MAX_SECONDS = 3600
+JOBS_LEASE_SECONDS = 300
+JOBS_RETENTION_HOURS = 24
+
+INGREDIENT_INDEX_TTL = 300
+INGREDIENT_USAGE_REFRESH_DELAY = 60
+INGREDIENT_SEARCH_LIMIT = 50
+INGREDIENT_SEARCH_BUDGET_MS = 30
+
+FACETS_CACHE_TTL = 600
+FACETS_TOP_AUTHORS = 10
+
+MAX_BATCH_IDS = 100
+
+SYNC_PAGE_SIZE = 100
+SYNC_MAX_PAGE_SIZE = 500
+SYNC_SETTLE_SECONDS = 2
+SYNC_TOMBSTONE_DAYS = 30
+
+DELETION_BATCH_SIZE = 1000
+IMAGE_DELETION_DELAY = 3600
+
+RECIPE_DOCUMENT_SERIALIZER = "api.serializers.RecipeDocumentSerializer"
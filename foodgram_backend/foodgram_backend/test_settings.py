@@ -0,0 +1,29 @@
+import os
+import tempfile
+
+from foodgram_backend.settings import *  # noqa: F401,F403
+from foodgram_backend.settings import BASE_DIR, DATABASES
+
+# Без DB_ENGINE тесты идут на SQLite, чтобы их можно было запустить
+# локально без PostgreSQL.
+if "DB_ENGINE" not in os.environ:
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": BASE_DIR / "db.sqlite3",
+            # Файл, а не память: иначе соединение реплики упирается в
+            # табличные блокировки общего кэша SQLite.
+            "TEST": {"NAME": BASE_DIR / "test.sqlite3"},
+        }
+    }
+
+# Вторая база изображает реплику: в тестах она зеркалит основную, а роутер
+# всё равно направляет на неё безопасные запросы.
+DATABASES["replica_0"] = {
+    **DATABASES["default"],
+    "TEST": {"MIRROR": "default"},
+}
+DATABASE_REPLICAS = ["replica_0"]
+
+# Свой файл на каждый запуск, чтобы лимиты прошлых прогонов не мешали.
+THROTTLE_DB_PATH = os.path.join(tempfile.mkdtemp(), "throttle.db")
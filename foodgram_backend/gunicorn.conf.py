@@ -0,0 +1,75 @@
+"""Конфигурация gunicorn для продакшена.
+
+Все значения можно переопределить переменными окружения GUNICORN_*.
+Профили сравниваются сценарием ``python -m benchmarks.server``.
+"""
+import gc
+import multiprocessing
+import os
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+
+# sync - один запрос на процесс; gthread - потоки в каждом процессе,
+# у каждого потока своё постоянное соединение с БД; gevent/uvicorn
+# требуют установки соответствующих пакетов.
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+
+# Бюджет соединений с БД на один экземпляр бэкенда. PostgreSQL по
+# умолчанию принимает 100 соединений; остаток нужен воркеру очереди,
+# миграциям и psql. С пулером (PgBouncer в режиме transaction и
+# DB_CONN_MAX_AGE=0) бюджет можно поднять до размера его клиентского пула.
+db_connections = int(os.getenv("GUNICORN_DB_CONNECTIONS", 60))
+workers = int(
+    os.getenv(
+        "GUNICORN_WORKERS",
+        min(multiprocessing.cpu_count() * 2 + 1, db_connections),
+    )
+)
+threads = int(
+    os.getenv("GUNICORN_THREADS", min(4, max(1, db_connections // workers)))
+)
+if worker_class == "gthread" and workers * threads > db_connections:
+    raise RuntimeError(
+        f"{workers} воркеров по {threads} потока держат до "
+        f"{workers * threads} соединений с БД при бюджете "
+        f"{db_connections}: уменьшите GUNICORN_WORKERS или "
+        f"GUNICORN_THREADS либо поднимите GUNICORN_DB_CONNECTIONS"
+    )
+
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 30))
+graceful_timeout = 30
+keepalive = 5
+
+# Перезапуск воркеров ограничивает рост памяти, jitter разносит
+# перезапуски во времени.
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", 1000))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", 100))
+
+preload_app = os.getenv("GUNICORN_PRELOAD", "True").lower() == "true"
+worker_tmp_dir = "/dev/shm" if os.path.isdir("/dev/shm") else None
+
+accesslog = "-"
+errorlog = "-"
+
+
+def when_ready(server):
+    # Объекты, загруженные мастером, переносятся в постоянное поколение,
+    # чтобы сборщик мусора в воркерах не копировал их страницы памяти.
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    # Соединения мастера не должны разделяться между процессами.
+    from django.db import connections
+
+    connections.close_all()
+
+
+def post_worker_init(worker):
+    # Индекс ингредиентов строится до первого запроса, а не во время него.
+    from django.db import connection
+
+    from recipes import search
+
+    search.get_index()
+    connection.close()
@@ -0,0 +1,19 @@
+from django.contrib import admin
+
+from recipes.admin import ScalableAdmin
+
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(ScalableAdmin):
+    list_display = ("name", "status", "attempts", "run_at", "finished")
+    list_filter = ("status", "name")
+    readonly_fields = ("created", "finished", "locked_at", "last_error")
+    actions = ("retry",)
+
+    @admin.action(description="Повторить выбранные задачи")
+    def retry(self, request, queryset):
+        queryset.filter(status=Job.Status.FAILED).update(
+            status=Job.Status.QUEUED, attempts=0, finished=None
+        )
@@ -0,0 +1,90 @@
+import signal
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connection
+from django.utils import timezone
+
+from jobs import queue
+
+PURGE_INTERVAL = 3600
+
+
+def run_job(job):
+    close_old_connections()
+    try:
+        queue.run(job)
+    finally:
+        close_old_connections()
+
+
+class Command(BaseCommand):
+    help = "Выполняет фоновые задачи из очереди в базе данных"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=4)
+        parser.add_argument("--poll-interval", type=float, default=1)
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Выполнить готовые задачи и завершиться",
+        )
+
+    def handle(self, *args, **options):
+        if not queue.uses_database():
+            raise CommandError(
+                "Очередь в БД требует SKIP LOCKED (PostgreSQL); на этой СУБД "
+                "задачи выполняются веб-процессом сразу после фиксации"
+            )
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        concurrency = options["concurrency"]
+        heartbeat_interval = settings.JOBS_LEASE_SECONDS / 3
+        purged_at = 0
+        heartbeat_at = time.monotonic()
+        running = {}
+        with ThreadPoolExecutor(
+            max_workers=concurrency, thread_name_prefix="worker"
+        ) as executor:
+            while not self.stopping:
+                running = {
+                    future: job_id
+                    for future, job_id in running.items()
+                    if not future.done()
+                }
+                if (
+                    running
+                    and time.monotonic() - heartbeat_at > heartbeat_interval
+                ):
+                    queue.heartbeat(list(running.values()))
+                    heartbeat_at = time.monotonic()
+                free = concurrency - len(running)
+                jobs = queue.claim(free) if free else []
+                for job in jobs:
+                    running[executor.submit(run_job, job)] = job.pk
+                if jobs:
+                    continue
+                if options["once"] and not running:
+                    break
+                if time.monotonic() - purged_at > PURGE_INTERVAL:
+                    queue.purge(
+                        timezone.now()
+                        - timedelta(hours=settings.JOBS_RETENTION_HOURS)
+                    )
+                    purged_at = time.monotonic()
+                if running:
+                    wait(
+                        running,
+                        timeout=options["poll_interval"],
+                        return_when="FIRST_COMPLETED",
+                    )
+                else:
+                    time.sleep(options["poll_interval"])
+        connection.close()
+
+    def stop(self, signum, frame):
+        self.stopping = True
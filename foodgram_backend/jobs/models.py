@@ -0,0 +1,64 @@
+from django.db import models
+from django.db.models import Q, UniqueConstraint
+from django.utils import timezone
+
+
+class Job(models.Model):
+    """Модель фоновой задачи"""
+
+    class Status(models.TextChoices):
+        QUEUED = "queued", "В очереди"
+        RUNNING = "running", "Выполняется"
+        DONE = "done", "Выполнена"
+        FAILED = "failed", "Ошибка"
+
+    name = models.CharField("Задача", max_length=200)
+    args = models.JSONField("Аргументы", default=list, blank=True)
+    kwargs = models.JSONField(
+        "Именованные аргументы", default=dict, blank=True
+    )
+    dedupe_key = models.CharField(
+        "Ключ дедупликации", max_length=200, blank=True, null=True
+    )
+    status = models.CharField(
+        "Статус",
+        max_length=10,
+        choices=Status.choices,
+        default=Status.QUEUED,
+    )
+    attempts = models.PositiveSmallIntegerField("Попытки", default=0)
+    max_attempts = models.PositiveSmallIntegerField(
+        "Максимум попыток", default=5
+    )
+    run_at = models.DateTimeField("Запуск не раньше", default=timezone.now)
+    locked_at = models.DateTimeField("Взята в работу", null=True, blank=True)
+    last_error = models.TextField("Последняя ошибка", blank=True)
+    created = models.DateTimeField("Создана", auto_now_add=True)
+    finished = models.DateTimeField("Завершена", null=True, blank=True)
+
+    class Meta:
+        ordering = ("-id",)
+        verbose_name = "Фоновая задача"
+        verbose_name_plural = "Фоновые задачи"
+        constraints = [
+            UniqueConstraint(
+                fields=("dedupe_key",),
+                condition=Q(status="queued"),
+                name="job_unique_queued_dedupe_key",
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=("run_at",),
+                condition=Q(status="queued"),
+                name="job_queued_run_at_idx",
+            ),
+            models.Index(
+                fields=("locked_at",),
+                condition=Q(status="running"),
+                name="job_running_locked_at_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk}"
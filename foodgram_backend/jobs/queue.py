@@ -0,0 +1,175 @@
+import logging
+import traceback
+from datetime import timedelta
+from functools import partial
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+MAX_ERROR_LENGTH = 10000
+LEASE_EXPIRED_ERROR = "Аренда истекла: воркер не завершил последнюю попытку"
+
+
+def task(func):
+    """Регистрирует функцию как фоновую задачу.
+
+    Функция получает атрибут enqueue для постановки в очередь. Аргументы
+    задачи должны сериализоваться в JSON.
+    """
+    func.job_name = f"{func.__module__}.{func.__name__}"
+    func.enqueue = partial(enqueue, func)
+    return func
+
+
+def resolve(name):
+    func = import_string(name)
+    if getattr(func, "job_name", None) != name:
+        raise ImportError(f"{name} не зарегистрирована как задача")
+    return func
+
+
+def uses_database():
+    """Очередь в БД работает только там, где есть SKIP LOCKED."""
+    return (
+        not settings.JOBS_EAGER
+        and connection.features.has_select_for_update_skip_locked
+    )
+
+
+def backoff(attempt):
+    return min(
+        settings.JOBS_BACKOFF_SECONDS * 2 ** (attempt - 1),
+        settings.JOBS_BACKOFF_MAX_SECONDS,
+    )
+
+
+def enqueue(func, *args, dedupe_key=None, delay=0, **kwargs):
+    """Ставит задачу в очередь после фиксации текущей транзакции.
+
+    Пока в очереди есть задача с тем же dedupe_key, повторная не
+    создаётся. В PostgreSQL задача записывается в ту же транзакцию, что и
+    изменения, которые её породили. На остальных СУБД задача выполняется
+    сразу после фиксации в том же потоке, без задержки и дедупликации:
+    фоновые потоки писали бы в SQLite параллельно с запросами и падали
+    бы с "database is locked".
+    """
+    if uses_database():
+        Job.objects.bulk_create(
+            [
+                Job(
+                    name=func.job_name,
+                    args=list(args),
+                    kwargs=kwargs,
+                    dedupe_key=dedupe_key,
+                    max_attempts=settings.JOBS_MAX_ATTEMPTS,
+                    run_at=timezone.now() + timedelta(seconds=delay),
+                )
+            ],
+            ignore_conflicts=True,
+        )
+    else:
+        transaction.on_commit(partial(run_now, func, args, kwargs))
+
+
+def run_now(func, args, kwargs):
+    """Выполняет задачу в текущем потоке; запрос, изменения которого уже
+    зафиксированы, не должен падать из-за неё."""
+    try:
+        func(*args, **kwargs)
+    except Exception:
+        logger.exception("Job %s failed", func.job_name)
+
+
+def claim(limit):
+    """Забирает готовые к выполнению задачи, пропуская занятые другими."""
+    now = timezone.now()
+    expired = Q(
+        status=Job.Status.RUNNING,
+        locked_at__lt=now - timedelta(seconds=settings.JOBS_LEASE_SECONDS),
+    )
+    with transaction.atomic():
+        # Задача, уронившая воркер на последней попытке, больше не берётся.
+        Job.objects.filter(expired, attempts__gte=F("max_attempts")).update(
+            status=Job.Status.FAILED,
+            finished=now,
+            locked_at=None,
+            last_error=LEASE_EXPIRED_ERROR,
+        )
+        ids = list(
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(
+                Q(status=Job.Status.QUEUED, run_at__lte=now)
+                | (expired & Q(attempts__lt=F("max_attempts")))
+            )
+            .order_by("run_at")
+            .values_list("id", flat=True)[:limit]
+        )
+        Job.objects.filter(id__in=ids).update(
+            status=Job.Status.RUNNING,
+            locked_at=now,
+            attempts=F("attempts") + 1,
+        )
+    return list(Job.objects.filter(id__in=ids))
+
+
+def heartbeat(job_ids):
+    """Продлевает аренду выполняющихся задач, чтобы их не забрали повторно."""
+    return Job.objects.filter(
+        id__in=job_ids, status=Job.Status.RUNNING
+    ).update(locked_at=timezone.now())
+
+
+def run(job):
+    """Выполняет взятую задачу и записывает результат."""
+    try:
+        func = resolve(job.name)
+    except ImportError:
+        job.max_attempts = job.attempts
+        fail(job, traceback.format_exc()[-MAX_ERROR_LENGTH:])
+        return
+    try:
+        func(*job.args, **job.kwargs)
+    except Exception:
+        logger.exception("Job %s #%s failed", job.name, job.pk)
+        fail(job, traceback.format_exc()[-MAX_ERROR_LENGTH:])
+    else:
+        Job.objects.filter(pk=job.pk).update(
+            status=Job.Status.DONE, finished=timezone.now(), last_error=""
+        )
+
+
+def fail(job, error):
+    jobs = Job.objects.filter(pk=job.pk)
+    if job.attempts >= job.max_attempts:
+        jobs.update(
+            status=Job.Status.FAILED, finished=timezone.now(), last_error=error
+        )
+        return
+    try:
+        with transaction.atomic():
+            jobs.update(
+                status=Job.Status.QUEUED,
+                run_at=timezone.now()
+                + timedelta(seconds=backoff(job.attempts)),
+                locked_at=None,
+                last_error=error,
+            )
+    except IntegrityError:
+        # Такая же задача уже стоит в очереди и выполнит ту же работу.
+        jobs.update(
+            status=Job.Status.DONE, finished=timezone.now(), last_error=error
+        )
+
+
+def purge(older_than):
+    """Удаляет выполненные задачи, завершённые раньше указанного момента."""
+    return Job.objects.filter(
+        status=Job.Status.DONE, finished__lt=older_than
+    ).delete()[0]
@@ -0,0 +1,140 @@
+import threading
+from datetime import timedelta
+from unittest import skipUnless
+
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from . import queue
+from .models import Job
+
+calls = []
+
+postgresql_only = skipUnless(
+    connection.vendor == "postgresql",
+    "SKIP LOCKED в тестовом окружении есть только у PostgreSQL",
+)
+
+
+@queue.task
+def record(value):
+    calls.append(value)
+
+
+@queue.task
+def explode():
+    raise ValueError("сбой задачи")
+
+
+@postgresql_only
+@override_settings(JOBS_EAGER=False, JOBS_MAX_ATTEMPTS=2)
+class QueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def run_failing(self, job):
+        with self.assertLogs("jobs.queue", "ERROR"):
+            queue.run(job)
+
+    def test_dedupe_key_collapses_queued_jobs(self):
+        record.enqueue(1, dedupe_key="record")
+        record.enqueue(2, dedupe_key="record")
+        self.assertEqual(Job.objects.count(), 1)
+        [job] = queue.claim(10)
+        record.enqueue(3, dedupe_key="record")
+        self.assertEqual(
+            list(Job.objects.order_by("id").values_list("args", "status")),
+            [([1], Job.Status.RUNNING), ([3], Job.Status.QUEUED)],
+        )
+        queue.run(job)
+        self.assertEqual(calls, [1])
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Status.DONE)
+
+    @override_settings(JOBS_BACKOFF_SECONDS=10)
+    def test_failed_job_is_retried_with_backoff(self):
+        explode.enqueue()
+        [job] = queue.claim(10)
+        self.run_failing(job)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Status.QUEUED)
+        self.assertEqual(job.attempts, 1)
+        self.assertIn("ValueError", job.last_error)
+        self.assertGreater(job.run_at, timezone.now() + timedelta(seconds=5))
+        self.assertEqual(queue.claim(10), [])
+
+        Job.objects.update(run_at=timezone.now())
+        [job] = queue.claim(10)
+        self.assertEqual(job.attempts, 2)
+        self.run_failing(job)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Status.FAILED)
+
+    def test_retry_yields_to_queued_duplicate(self):
+        explode.enqueue(dedupe_key="explode")
+        [job] = queue.claim(10)
+        explode.enqueue(dedupe_key="explode")
+        self.run_failing(job)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Status.DONE)
+        self.assertEqual(
+            Job.objects.filter(status=Job.Status.QUEUED).count(), 1
+        )
+
+    def test_expired_lease_is_reclaimed(self):
+        record.enqueue(1)
+        [job] = queue.claim(10)
+        Job.objects.update(locked_at=timezone.now() - timedelta(days=1))
+        [job] = queue.claim(10)
+        self.assertEqual(job.attempts, 2)
+        Job.objects.update(locked_at=timezone.now() - timedelta(days=1))
+        self.assertEqual(queue.claim(10), [])
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Status.FAILED)
+        self.assertEqual(job.last_error, queue.LEASE_EXPIRED_ERROR)
+
+
+@postgresql_only
+@override_settings(JOBS_EAGER=False)
+class ClaimTests(TransactionTestCase):
+    def setUp(self):
+        calls.clear()
+
+    def lock(self, job_id):
+        """Держит строку задачи под блокировкой из другого соединения.
+
+        Возвращает событие, которое снимает блокировку, и поток.
+        """
+        locked, release = threading.Event(), threading.Event()
+
+        def hold():
+            try:
+                with transaction.atomic():
+                    Job.objects.select_for_update().get(id=job_id)
+                    locked.set()
+                    release.wait(10)
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=hold)
+        thread.start()
+        self.assertTrue(locked.wait(10))
+        return release, thread
+
+    def test_claim_skips_locked_jobs(self):
+        record.enqueue(1)
+        record.enqueue(2)
+        first, second = Job.objects.order_by("id")
+        release, thread = self.lock(first.id)
+        try:
+            self.assertEqual(
+                [job.id for job in queue.claim(10)], [second.id]
+            )
+        finally:
+            release.set()
+            thread.join()
+        [job] = queue.claim(10)
+        self.assertEqual(job.id, first.id)
+        queue.run(job)
+        self.assertEqual(calls, [1])
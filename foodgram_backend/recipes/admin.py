@@ -1,51 +1,189 @@
 from django.contrib import admin
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 
+from . import deletion, nutrition, search
 from .models import (
     FavoriteRecipe,
     Ingredient,
+    IngredientNutrition,
     IngredientsRecipe,
+    MealPlan,
+    MealPlanItem,
     Recipe,
     ShoppingCart,
     Tag,
 )
+from .paginators import EstimatedCountPaginator
+
+
+def refresh_recipes(recipe_ids):
+    """Пересчитывает рецепты после правки состава в админке.
+
+    Строки состава сохраняются по одной, поэтому задачи ставятся здесь,
+    один раз на рецепт, а не сигналами на каждую строку.
+    """
+    for recipe_id in set(recipe_ids) - {None}:
+        nutrition.refresh.enqueue(
+            [recipe_id], dedupe_key=f"nutrition:recipe:{recipe_id}"
+        )
+    search.schedule_usage_refresh()
+
+
+class ScalableAdmin(admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+class FastDeleteAdmin(ScalableAdmin):
+    """Админка, удаляющая объекты без обхода связей в Python.
+
+    Страница подтверждения не перечисляет связанные объекты, а само
+    удаление выполняет delete_function: подкласс задаёт её как
+    staticmethod, принимающий список первичных ключей.
+    """
+
+    delete_function = None
+
+    def __init__(self, model, admin_site):
+        super().__init__(model, admin_site)
+        if self.delete_function is None:
+            raise ImproperlyConfigured(
+                f"{type(self).__name__} должен задать delete_function"
+            )
+
+    def get_deleted_objects(self, objs, request):
+        objs = list(objs)
+        opts = self.model._meta
+        perms_needed = set()
+        if not self.has_delete_permission(request):
+            perms_needed.add(opts.verbose_name)
+        return (
+            [str(obj) for obj in objs],
+            {opts.verbose_name_plural: len(objs)},
+            perms_needed,
+            [],
+        )
+
+    def delete_model(self, request, obj):
+        self.delete_function([obj.pk])
+
+    def delete_queryset(self, request, queryset):
+        self.delete_function(list(queryset.values_list("pk", flat=True)))
+
+
+class IngredientNutritionInline(admin.StackedInline):
+    model = IngredientNutrition
 
 
 @admin.register(Ingredient)
-class IngredientAdmin(admin.ModelAdmin):
-    list_display = ("name",)
-    list_filter = ("name",)
+class IngredientAdmin(ScalableAdmin):
+    list_display = ("name", "measurement_unit")
+    search_fields = ("^name",)
+    inlines = [
+        IngredientNutritionInline,
+    ]
 
 
 class IngredientInline(admin.TabularInline):
     model = IngredientsRecipe
     min_num = 1
+    autocomplete_fields = ("ingredient",)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related("ingredient")
 
 
 @admin.register(Tag)
 class TagAdmin(admin.ModelAdmin):
-    pass
+    search_fields = ("name",)
 
 
 @admin.register(Recipe)
-class RecipeAdmin(admin.ModelAdmin):
-    list_display = ("name", "author")
-    list_filter = ("name", "author")
+class RecipeAdmin(FastDeleteAdmin):
+    list_display = ("name", "author", "favorites_count")
+    list_select_related = ("author",)
+    list_filter = ("tags",)
+    search_fields = ("^name", "^author__username")
+    autocomplete_fields = ("author", "tags")
+    delete_function = staticmethod(deletion.schedule_recipes_deletion)
 
     inlines = [
         IngredientInline,
     ]
 
+    def get_queryset(self, request):
+        favorites = (
+            FavoriteRecipe.objects.filter(recipe=OuterRef("pk"))
+            .values("recipe")
+            .annotate(total=Count("id"))
+            .values("total")
+        )
+        return (
+            super()
+            .get_queryset(request)
+            .annotate(favorites_count=Coalesce(Subquery(favorites), 0))
+        )
+
+    @admin.display(description="В избранном", ordering="favorites_count")
+    def favorites_count(self, obj):
+        return obj.favorites_count
+
+    def save_formset(self, request, form, formset, change):
+        super().save_formset(request, form, formset, change)
+        if formset.model is IngredientsRecipe and formset.has_changed():
+            refresh_recipes([form.instance.pk])
+
 
 @admin.register(IngredientsRecipe)
-class IngredientsRecipeAdmin(admin.ModelAdmin):
-    pass
+class IngredientsRecipeAdmin(ScalableAdmin):
+    list_display = ("recipe", "ingredient", "amount")
+    list_select_related = ("recipe", "ingredient")
+    autocomplete_fields = ("recipe", "ingredient")
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        refresh_recipes([obj.recipe_id, form.initial.get("recipe")])
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        refresh_recipes([obj.recipe_id])
+
+    def delete_queryset(self, request, queryset):
+        recipe_ids = list(queryset.values_list("recipe_id", flat=True))
+        super().delete_queryset(request, queryset)
+        refresh_recipes(recipe_ids)
 
 
 @admin.register(FavoriteRecipe)
-class FavoriteRecipeAdmin(admin.ModelAdmin):
-    pass
+class FavoriteRecipeAdmin(ScalableAdmin):
+    list_display = ("user", "recipe")
+    list_select_related = ("user", "recipe")
+    autocomplete_fields = ("user", "recipe")
 
 
 @admin.register(ShoppingCart)
-class ShoppingCartAdmin(admin.ModelAdmin):
-    pass
+class ShoppingCartAdmin(ScalableAdmin):
+    list_display = ("user", "recipe")
+    list_select_related = ("user", "recipe")
+    autocomplete_fields = ("user", "recipe")
+
+
+class MealPlanItemInline(admin.TabularInline):
+    model = MealPlanItem
+    autocomplete_fields = ("recipe",)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related("recipe")
+
+
+@admin.register(MealPlan)
+class MealPlanAdmin(ScalableAdmin):
+    list_display = ("name", "user", "start_date")
+    list_select_related = ("user",)
+    autocomplete_fields = ("user",)
+
+    inlines = [
+        MealPlanItemInline,
+    ]
@@ -0,0 +1,141 @@
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import models, transaction
+
+from jobs.queue import task
+from users.models import User
+
+from . import facets, search
+from .models import FavoriteRecipe, Recipe, ShoppingCart, Tombstone
+
+
+def fast_delete(queryset):
+    """Удаляет строки и всё зависимое от них запросами DELETE по множествам.
+
+    В отличие от QuerySet.delete() объекты не загружаются в память, а
+    сигналы не отправляются: их последствия вызывающий код берёт на себя.
+    """
+    model = queryset.model
+    pks = queryset.values("pk")
+    for relation in model._meta.related_objects:
+        related = relation.related_model._base_manager
+        if relation.many_to_many:
+            through = relation.through._base_manager
+            through.filter(
+                **{f"{relation.field.m2m_reverse_field_name()}__in": pks}
+            )._raw_delete(queryset.db)
+            continue
+        children = related.filter(**{f"{relation.field.name}__in": pks})
+        if relation.on_delete is models.CASCADE:
+            fast_delete(children)
+        elif relation.on_delete is models.SET_NULL:
+            children.update(**{relation.field.name: None})
+        elif relation.on_delete is not models.DO_NOTHING:
+            children.delete()
+    for field in model._meta.local_many_to_many:
+        field.remote_field.through._base_manager.filter(
+            **{f"{field.m2m_field_name()}__in": pks}
+        )._raw_delete(queryset.db)
+    return queryset._raw_delete(queryset.db)
+
+
+def batches(queryset, size):
+    """Первичные ключи выборки пачками; строки должны удаляться по ходу."""
+    while True:
+        batch = list(queryset.values_list("pk", flat=True)[:size])
+        if not batch:
+            return
+        yield batch
+
+
+@task
+def remove_unused_images(names):
+    """Удаляет файлы, на которые больше не ссылается ни один рецепт.
+
+    Хранилище адресует файлы по содержимому, и одна картинка может
+    принадлежать нескольким рецептам. Задача ставится с задержкой
+    IMAGE_DELETION_DELAY: за это время успевает зафиксироваться рецепт,
+    загрузивший такую же картинку параллельно с удалением.
+    """
+    names = set(filter(None, names))
+    names -= set(
+        Recipe.objects.filter(image__in=names).values_list("image", flat=True)
+    )
+    for name in names:
+        default_storage.delete(name)
+
+
+def delete_recipe_batch(recipe_ids):
+    with transaction.atomic():
+        images = dict(
+            Recipe.objects.filter(id__in=recipe_ids).values_list(
+                "id", "image"
+            )
+        )
+        fast_delete(Recipe.objects.filter(id__in=images))
+        Tombstone.objects.bulk_create(
+            Tombstone(kind=Tombstone.Kind.RECIPE, object_id=recipe_id)
+            for recipe_id in images
+        )
+        facets.bump_generation()
+        search.schedule_usage_refresh()
+        remove_unused_images.enqueue(
+            list(filter(None, images.values())),
+            delay=settings.IMAGE_DELETION_DELAY,
+        )
+
+
+@task
+def delete_recipes(recipe_ids):
+    """Удаляет рецепты вместе со связанными строками пачками."""
+    size = settings.DELETION_BATCH_SIZE
+    for start in range(0, len(recipe_ids), size):
+        end = start + size
+        delete_recipe_batch(recipe_ids[start:end])
+
+
+def schedule_recipes_deletion(recipe_ids):
+    """Небольшие наборы удаляет сразу, большие - фоновой задачей."""
+    if len(recipe_ids) > settings.DELETION_BATCH_SIZE:
+        delete_recipes.enqueue(recipe_ids)
+    else:
+        delete_recipes(recipe_ids)
+
+
+@task
+def delete_user(user_id):
+    """Удаляет пользователя: сначала его рецепты и связи пачками, затем его.
+
+    Каждая пачка коммитится отдельно, поэтому блокировки держатся недолго,
+    а прерванное удаление продолжается повторным запуском задачи.
+    """
+    size = settings.DELETION_BATCH_SIZE
+    for batch in batches(Recipe.objects.filter(author_id=user_id), size):
+        delete_recipe_batch(batch)
+    with transaction.atomic():
+        for model in (FavoriteRecipe, ShoppingCart):
+            rows = model.objects.filter(user_id=user_id)
+            rows._raw_delete(rows.db)
+    for relation in User._meta.related_objects:
+        if relation.many_to_many or relation.on_delete is not models.CASCADE:
+            continue
+        children = relation.related_model._base_manager.filter(
+            **{relation.field.name: user_id}
+        )
+        for batch in batches(children, size):
+            with transaction.atomic():
+                fast_delete(children.model._base_manager.filter(pk__in=batch))
+    with transaction.atomic():
+        fast_delete(User.objects.filter(pk=user_id))
+        facets.bump_generation()
+
+
+def schedule_user_deletion(user):
+    """Сразу отключает пользователя и ставит его удаление в очередь."""
+    schedule_users_deletion([user.pk])
+
+
+def schedule_users_deletion(user_ids):
+    User.objects.filter(pk__in=user_ids).update(is_active=False)
+    for user_id in user_ids:
+        delete_user.enqueue(user_id, dedupe_key=f"deletion:user:{user_id}")
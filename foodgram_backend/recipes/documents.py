@@ -0,0 +1,123 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Prefetch
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from jobs.queue import task
+
+from .models import IngredientsRecipe, Recipe, RecipeDocument
+
+RENDER_BATCH_SIZE = 500
+
+
+def serializer_class():
+    return import_string(settings.RECIPE_DOCUMENT_SERIALIZER)
+
+
+def render(recipe_ids):
+    """Строит и сохраняет документы рецептов; возвращает их по id."""
+    recipes = (
+        Recipe.objects.filter(id__in=recipe_ids)
+        .select_related("author")
+        .prefetch_related(
+            "tags",
+            Prefetch(
+                "ingredients_recipe",
+                queryset=IngredientsRecipe.objects.select_related(
+                    "ingredient"
+                ),
+            ),
+        )
+    )
+    documents = {
+        recipe.id: serializer_class()(recipe).data for recipe in recipes
+    }
+    rendered_at = timezone.now()
+    with transaction.atomic():
+        existing = set(
+            RecipeDocument.objects.filter(
+                recipe_id__in=documents
+            ).values_list("recipe_id", flat=True)
+        )
+        RecipeDocument.objects.bulk_update(
+            [
+                RecipeDocument(
+                    recipe_id=recipe_id, data=data, rendered_at=rendered_at
+                )
+                for recipe_id, data in documents.items()
+                if recipe_id in existing
+            ],
+            ["data", "rendered_at"],
+        )
+        RecipeDocument.objects.bulk_create(
+            (
+                RecipeDocument(recipe_id=recipe_id, data=data)
+                for recipe_id, data in documents.items()
+                if recipe_id not in existing
+            ),
+            ignore_conflicts=True,
+        )
+    return documents
+
+
+def get_many(recipes):
+    """Документы рецептов по id; недостающие строятся одним вызовом render."""
+    result = {}
+    missing = []
+    for recipe in recipes:
+        try:
+            result[recipe.id] = recipe.document.data
+        except RecipeDocument.DoesNotExist:
+            missing.append(recipe.id)
+    if missing:
+        result.update(render(missing))
+    return result
+
+
+def get(recipe):
+    return get_many([recipe])[recipe.id]
+
+
+def invalidate(recipe_ids):
+    """Помечает документы устаревшими и ставит их перестроение в очередь.
+
+    До перестроения читатели получают прежнюю версию документа.
+    """
+    RecipeDocument.objects.filter(recipe_id__in=recipe_ids).update(stale=True)
+    refresh_stale.enqueue(dedupe_key="documents:stale")
+
+
+@task
+def refresh_missing():
+    """Пачками строит документы для рецептов, у которых их нет."""
+    while True:
+        recipe_ids = list(
+            Recipe.objects.filter(document__isnull=True).values_list(
+                "id", flat=True
+            )[:RENDER_BATCH_SIZE]
+        )
+        if not recipe_ids:
+            return
+        render(recipe_ids)
+
+
+@task
+def refresh_stale():
+    """Пачками перестраивает устаревшие документы на месте.
+
+    Отметка снимается до чтения данных, поэтому изменение, пришедшее во
+    время перестроения, снова пометит документ и не потеряется.
+    """
+    while True:
+        recipe_ids = list(
+            RecipeDocument.objects.filter(stale=True).values_list(
+                "recipe_id", flat=True
+            )[:RENDER_BATCH_SIZE]
+        )
+        if not recipe_ids:
+            return
+        RecipeDocument.objects.filter(recipe_id__in=recipe_ids).update(
+            stale=False
+        )
+        render(recipe_ids)
@@ -0,0 +1,201 @@
+import hashlib
+import time
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.db import connections, transaction
+from django.db.models import Case, Count, F, IntegerField, Value, When
+
+from users.models import User
+
+from .models import Generation, Recipe, Tag
+
+GENERATION_KEY = "recipes:generation"
+USER_GENERATION_KEY = "recipes:generation:user:{}"
+# Верхние границы интервалов времени приготовления в минутах.
+COOKING_TIME_BUCKETS = (15, 30, 60, 120)
+BUCKET_LABELS = [
+    f"{low + 1}-{high}"
+    for low, high in zip((-1,) + COOKING_TIME_BUCKETS, COOKING_TIME_BUCKETS)
+] + [f"{COOKING_TIME_BUCKETS[-1] + 1}+"]
+
+
+def generation(key=GENERATION_KEY):
+    """Текущее поколение данных; меняется при каждом изменении рецептов.
+
+    Счётчик хранится в БД, а не в кэше: кэш по умолчанию свой у каждого
+    процесса, и сдвиг в одном воркере gunicorn или в run_worker не
+    увидели бы остальные.
+    """
+    value = (
+        Generation.objects.filter(key=key)
+        .values_list("value", flat=True)
+        .first()
+    )
+    if value is None:
+        # Начало с текущего времени не совпадёт с поколениями, чьи
+        # значения остались в общем кэше после пересоздания базы.
+        value = time.time_ns()
+        Generation.objects.bulk_create(
+            [Generation(key=key, value=value)], ignore_conflicts=True
+        )
+    return value
+
+
+def increment(key):
+    if not Generation.objects.filter(key=key).update(value=F("value") + 1):
+        generation(key)
+
+
+def bump_generation(key=GENERATION_KEY):
+    """Сдвигает поколение после фиксации транзакции: иначе читатель успел
+    бы закэшировать под новым поколением ещё старые данные."""
+    transaction.on_commit(partial(increment, key))
+
+
+def bucket_case():
+    return Case(
+        *(
+            When(cooking_time__lte=high, then=Value(number))
+            for number, high in enumerate(COOKING_TIME_BUCKETS)
+        ),
+        default=Value(len(COOKING_TIME_BUCKETS)),
+        output_field=IntegerField(),
+    )
+
+
+def bucket_sql(column):
+    whens = " ".join(
+        f"WHEN {column} <= {int(high)} THEN {number}"
+        for number, high in enumerate(COOKING_TIME_BUCKETS)
+    )
+    return f"CASE {whens} ELSE {len(COOKING_TIME_BUCKETS)} END"
+
+
+def grouped_counts(queryset, top_authors):
+    """Все три разреза одним запросом через GROUPING SETS (PostgreSQL)."""
+    counts = {"tags": {}, "authors": {}, "cooking_time": {}}
+    try:
+        inner, params = (
+            queryset.order_by()
+            .values("id", "author_id", "cooking_time")
+            .distinct()
+            .query.sql_with_params()
+        )
+    except EmptyResultSet:
+        return counts
+    bucket = bucket_sql("r.cooking_time")
+    tags_table = Recipe.tags.through._meta.db_table
+    sql = f"""
+        SELECT kind, key, total FROM (
+            SELECT
+                CASE
+                    WHEN GROUPING(rt.tag_id) = 0 THEN 'tags'
+                    WHEN GROUPING(r.author_id) = 0 THEN 'authors'
+                    ELSE 'cooking_time'
+                END AS kind,
+                CASE
+                    WHEN GROUPING(rt.tag_id) = 0 THEN rt.tag_id
+                    WHEN GROUPING(r.author_id) = 0 THEN r.author_id
+                    ELSE {bucket}
+                END AS key,
+                COUNT(DISTINCT r.id) AS total,
+                ROW_NUMBER() OVER (
+                    PARTITION BY GROUPING(rt.tag_id), GROUPING(r.author_id)
+                    ORDER BY COUNT(DISTINCT r.id) DESC
+                ) AS position
+            FROM ({inner}) r
+            LEFT JOIN {tags_table} rt ON rt.recipe_id = r.id
+            GROUP BY GROUPING SETS ((rt.tag_id), (r.author_id), ({bucket}))
+        ) facets
+        WHERE kind <> 'authors' OR position <= %s
+    """
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(sql, (*params, top_authors))
+        for kind, key, total in cursor.fetchall():
+            if key is not None:
+                counts[kind][key] = total
+    return counts
+
+
+def separate_counts(queryset, top_authors):
+    """Те же разрезы тремя запросами для СУБД без GROUPING SETS."""
+    queryset = queryset.order_by()
+    return {
+        "tags": dict(
+            Recipe.tags.through.objects.filter(
+                recipe_id__in=queryset.values("id")
+            )
+            .values("tag_id")
+            .annotate(total=Count("recipe_id"))
+            .values_list("tag_id", "total")
+        ),
+        "authors": dict(
+            queryset.values("author_id")
+            .annotate(total=Count("id", distinct=True))
+            .order_by("-total")
+            .values_list("author_id", "total")[:top_authors]
+        ),
+        "cooking_time": dict(
+            queryset.annotate(bucket=bucket_case())
+            .values("bucket")
+            .annotate(total=Count("id", distinct=True))
+            .values_list("bucket", "total")
+        ),
+    }
+
+
+def compute(queryset, top_authors):
+    if connections[queryset.db].vendor == "postgresql":
+        counts = grouped_counts(queryset, top_authors)
+    else:
+        counts = separate_counts(queryset, top_authors)
+    tags = Tag.objects.in_bulk(counts["tags"])
+    authors = User.objects.only("id", "username").in_bulk(counts["authors"])
+    return {
+        "tags": [
+            {
+                "id": tag.id,
+                "name": tag.name,
+                "slug": tag.slug,
+                "count": counts["tags"][tag.id],
+            }
+            for tag in sorted(tags.values(), key=lambda tag: tag.id)
+        ],
+        "authors": [
+            {
+                "id": author_id,
+                "username": authors[author_id].username,
+                "count": total,
+            }
+            for author_id, total in sorted(
+                counts["authors"].items(), key=lambda item: -item[1]
+            )
+            if author_id in authors
+        ],
+        "cooking_time": [
+            {"bucket": label, "count": counts["cooking_time"].get(number, 0)}
+            for number, label in enumerate(BUCKET_LABELS)
+        ],
+    }
+
+
+def get_facets(queryset, params, user=None):
+    """Счётчики по тегам, авторам и времени приготовления из кэша.
+
+    Ключ кэша включает поколение данных, поэтому любое изменение рецептов
+    делает старые значения недоступными без явной очистки. Для фильтров,
+    зависящих от пользователя, учитывается и его личное поколение.
+    """
+    digest = hashlib.md5(repr(sorted(params)).encode()).hexdigest()
+    user_generation = (
+        generation(USER_GENERATION_KEY.format(user.pk)) if user else ""
+    )
+    key = f"facets:{generation()}:{user_generation}:{digest}"
+    return cache.get_or_set(
+        key,
+        lambda: compute(queryset, settings.FACETS_TOP_AUTHORS),
+        settings.FACETS_CACHE_TTL,
+    )
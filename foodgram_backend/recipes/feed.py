@@ -0,0 +1,124 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q
+
+from jobs.queue import task
+from users.models import Subscribe
+
+from .models import FeedEntry, Recipe
+
+POPULAR_AUTHORS_CACHE_KEY = "feed:popular_authors"
+FANOUT_BATCH_SIZE = 1000
+
+
+def popular_authors():
+    """Авторы, чьи рецепты не раскладываются по лентам при публикации."""
+
+    def compute():
+        return set(
+            Subscribe.objects.order_by()
+            .values("author")
+            .annotate(subscribers=Count("id"))
+            .filter(subscribers__gt=settings.FEED_FANOUT_MAX_SUBSCRIBERS)
+            .values_list("author", flat=True)
+        )
+
+    return cache.get_or_set(
+        POPULAR_AUTHORS_CACHE_KEY, compute, settings.FEED_POPULAR_AUTHORS_TTL
+    )
+
+
+def add_entries(user_ids, recipes):
+    FeedEntry.objects.bulk_create(
+        (
+            FeedEntry(
+                user_id=user_id,
+                recipe_id=recipe.id,
+                author_id=recipe.author_id,
+                pub_date=recipe.pub_date,
+            )
+            for user_id in user_ids
+            for recipe in recipes
+        ),
+        batch_size=FANOUT_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+@task
+def fan_out(recipe_id):
+    """Добавляет новый рецепт в ленты подписчиков автора."""
+    recipe = (
+        Recipe.objects.filter(id=recipe_id)
+        .only("id", "author_id", "pub_date")
+        .first()
+    )
+    if recipe is None or recipe.author_id in popular_authors():
+        return
+    subscribers = (
+        Subscribe.objects.filter(author_id=recipe.author_id)
+        .values_list("user_id", flat=True)
+        .iterator(chunk_size=FANOUT_BATCH_SIZE)
+    )
+    add_entries(subscribers, [recipe])
+
+
+@task
+def backfill(user_id, author_id):
+    """Заполняет ленту последними рецептами нового автора.
+
+    Задача выполняется позже подписки, поэтому подписка перепроверяется
+    под блокировкой: отписка дождётся вставки и сама удалит записи.
+    """
+    with transaction.atomic():
+        if not (
+            Subscribe.objects.select_for_update()
+            .filter(user_id=user_id, author_id=author_id)
+            .exists()
+        ):
+            return
+        recipes = Recipe.objects.filter(author_id=author_id).only(
+            "id", "author_id", "pub_date"
+        )[: settings.FEED_BACKFILL_SIZE]
+        add_entries([user_id], recipes)
+
+
+def remove_author(user_id, author_id):
+    FeedEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def get_feed(user, position=None, reverse=False, limit=None):
+    """Ключи (pub_date, recipe_id) страницы ленты, от новых к старым.
+
+    Лента складывается из разложенных записей и рецептов популярных
+    авторов: их рецепты не раскладываются по лентам, а подмешиваются при
+    чтении. Из каждой выборки читается не больше limit ключей после
+    position (до неё при reverse), поэтому чтение ленты ничего не пишет.
+    """
+    sources = [(FeedEntry.objects.filter(user=user), "recipe_id")]
+    authors = popular_authors() & set(
+        user.subscriber.values_list("author_id", flat=True)
+    )
+    if authors:
+        sources.append((Recipe.objects.filter(author_id__in=authors), "id"))
+    keys = set()
+    for queryset, field in sources:
+        if position is not None:
+            pub_date, recipe_id = position
+            lookup = "gt" if reverse else "lt"
+            queryset = queryset.filter(
+                Q(**{f"pub_date__{lookup}": pub_date})
+                | Q(pub_date=pub_date, **{f"{field}__{lookup}": recipe_id})
+            )
+        if reverse:
+            ordering = ("pub_date", field)
+        else:
+            ordering = ("-pub_date", f"-{field}")
+        keys.update(
+            queryset.order_by(*ordering).values_list("pub_date", field)[
+                :limit
+            ]
+        )
+    keys = sorted(keys, reverse=not reverse)[:limit]
+    return keys[::-1] if reverse else keys
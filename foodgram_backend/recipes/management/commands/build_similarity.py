@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from recipes import similarity
+
+
+class Command(BaseCommand):
+    help = "Перестраивает MinHash/LSH-индекс похожих рецептов"
+
+    def handle(self, *args, **options):
+        similarity.build()
+        self.stdout.write(
+            self.style.SUCCESS("Индекс похожих рецептов построен")
+        )
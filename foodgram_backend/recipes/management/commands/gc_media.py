@@ -0,0 +1,64 @@
+import posixpath
+from datetime import timedelta
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = "Удаляет файлы картинок, на которые не ссылается ни один рецепт"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--grace-hours",
+            type=float,
+            default=24,
+            help="Не трогать файлы моложе указанного числа часов",
+        )
+        parser.add_argument("--dry-run", action="store_true")
+
+    def walk(self, directory):
+        directories, files = default_storage.listdir(directory)
+        for name in files:
+            yield posixpath.join(directory, name)
+        for name in directories:
+            yield from self.walk(posixpath.join(directory, name))
+
+    def handle(self, *args, **options):
+        upload_to = Recipe._meta.get_field("image").upload_to.rstrip("/")
+        if not default_storage.exists(upload_to):
+            return
+        cutoff = timezone.now() - timedelta(hours=options["grace_hours"])
+        removed = 0
+        batch = []
+        for name in self.walk(upload_to):
+            batch.append(name)
+            if len(batch) >= options["batch_size"]:
+                removed += self.collect(batch, cutoff, options["dry_run"])
+                batch = []
+        if batch:
+            removed += self.collect(batch, cutoff, options["dry_run"])
+        self.stdout.write(
+            self.style.SUCCESS(f"Удалено неиспользуемых файлов: {removed}")
+        )
+
+    def collect(self, names, cutoff, dry_run):
+        referenced = set(
+            Recipe.objects.filter(image__in=names).values_list(
+                "image", flat=True
+            )
+        )
+        removed = 0
+        for name in names:
+            if name in referenced:
+                continue
+            if default_storage.get_modified_time(name) > cutoff:
+                continue
+            if not dry_run:
+                default_storage.delete(name)
+            removed += 1
+        return removed
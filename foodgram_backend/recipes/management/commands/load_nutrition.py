@@ -0,0 +1,65 @@
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from recipes import nutrition
+from recipes.models import Ingredient, IngredientNutrition
+
+BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = (
+        "Загружает пищевую ценность ингредиентов из CSV с колонками "
+        "name, measurement_unit, per, calories, proteins, fats, "
+        "carbohydrates (значения указаны на per единиц измерения) "
+        "и пересчитывает итоги рецептов"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Путь к CSV-файлу")
+
+    def handle(self, *args, **options):
+        ingredients = {
+            (name, unit): pk
+            for pk, name, unit in Ingredient.objects.values_list(
+                "id", "name", "measurement_unit"
+            )
+        }
+        rows = {}
+        missing = 0
+        try:
+            with open(options["path"], encoding="utf-8") as data_csv_file:
+                for row in csv.DictReader(data_csv_file):
+                    key = (row["name"], row["measurement_unit"])
+                    if key not in ingredients:
+                        missing += 1
+                        continue
+                    per = float(row.get("per") or 1)
+                    rows[ingredients[key]] = IngredientNutrition(
+                        ingredient_id=ingredients[key],
+                        **{
+                            nutrient: float(row[nutrient]) / per
+                            for nutrient in nutrition.NUTRIENTS
+                        },
+                    )
+        except (OSError, KeyError, ValueError, ZeroDivisionError) as error:
+            raise CommandError(f"Не удалось прочитать файл: {error!r}")
+
+        # Без сигналов: итоги рецептов пересчитываются ниже один раз.
+        with transaction.atomic():
+            existing = IngredientNutrition.objects.filter(
+                ingredient_id__in=rows
+            )
+            existing._raw_delete(existing.db)
+            IngredientNutrition.objects.bulk_create(
+                rows.values(), batch_size=BATCH_SIZE
+            )
+        updated = nutrition.backfill(list(rows))
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Загружено: {len(rows)}, не найдено ингредиентов: "
+                f"{missing}, пересчитано рецептов: {updated}"
+            )
+        )
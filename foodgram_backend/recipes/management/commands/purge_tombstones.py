@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from recipes.sync import purge_tombstones
+
+
+class Command(BaseCommand):
+    help = (
+        "Удаляет записи об удалённых объектах старше SYNC_TOMBSTONE_DAYS. "
+        "Клиентам с более старым водяным знаком нужна полная загрузка"
+    )
+
+    def handle(self, *args, **options):
+        purged = purge_tombstones()
+        self.stdout.write(self.style.SUCCESS(f"Удалено записей: {purged}"))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from recipes import trending
+
+
+class Command(BaseCommand):
+    help = (
+        "Применяет затухание к популярности рецептов. "
+        "Запускается по расписанию с периодом --hours"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--hours", type=float, default=1)
+        parser.add_argument(
+            "--rebuild",
+            action="store_true",
+            help=(
+                "Пересчитать популярность с нуля, с учётом удалений "
+                "из избранного и корзин"
+            ),
+        )
+
+    def handle(self, *args, **options):
+        if options["rebuild"]:
+            trending.rebuild()
+        else:
+            trending.decay(options["hours"])
+        self.stdout.write(self.style.SUCCESS("Популярность обновлена"))
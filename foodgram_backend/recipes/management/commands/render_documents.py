@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from recipes import documents
+from recipes.models import RecipeDocument
+
+
+class Command(BaseCommand):
+    help = "Строит недостающие и перестраивает устаревшие документы рецептов"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Перестроить все документы",
+        )
+
+    def handle(self, *args, **options):
+        if options["all"]:
+            RecipeDocument.objects.update(stale=True)
+        documents.refresh_missing()
+        documents.refresh_stale()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Документов: {RecipeDocument.objects.count()}"
+            )
+        )
@@ -0,0 +1,296 @@
+import csv
+import io
+import random
+from bisect import bisect_left
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from recipes import nutrition, search, trending
+from recipes.models import (
+    FavoriteRecipe,
+    Ingredient,
+    IngredientsRecipe,
+    Recipe,
+    ShoppingCart,
+    Tag,
+)
+from users.models import Subscribe, User
+
+DEFAULT_TAGS = (
+    ("Завтрак", "#E26C2D", "breakfast"),
+    ("Обед", "#49B64E", "lunch"),
+    ("Ужин", "#8775D2", "dinner"),
+)
+WORDS = (
+    "нарезать", "смешать", "добавить", "обжарить", "варить", "запекать",
+    "посолить", "поперчить", "остудить", "подавать", "тесто", "соус",
+    "минут", "огонь", "духовка", "сковорода", "кастрюля", "миска",
+)
+MIN_INGREDIENTS = 5
+MAX_INGREDIENTS = 30
+
+
+class Zipf:
+    """Выбор индекса из [0, n) по степенному закону"""
+
+    def __init__(self, rng, n, exponent):
+        if n < 1:
+            raise ValueError("Выбирать не из чего: n должно быть больше 0")
+        self.rng = rng
+        self.cum_weights = list(
+            accumulate(1 / (rank + 1) ** exponent for rank in range(n))
+        )
+        self.total = self.cum_weights[-1]
+
+    def __call__(self):
+        return bisect_left(self.cum_weights, self.rng.random() * self.total)
+
+
+class Command(BaseCommand):
+    help = (
+        "Генерирует пользователей, рецепты, избранное, списки покупок "
+        "и подписки для нагрузочного тестирования"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--recipes", type=int, default=5000)
+        parser.add_argument("--favorites", type=int, default=20000)
+        parser.add_argument("--carts", type=int, default=5000)
+        parser.add_argument("--subscriptions", type=int, default=10000)
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--exponent", type=float, default=1.1)
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument(
+            "--no-copy",
+            action="store_true",
+            help="Не использовать COPY даже на PostgreSQL",
+        )
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options["seed"])
+        self.exponent = options["exponent"]
+        self.batch_size = options["batch_size"]
+        self.use_copy = (
+            connection.vendor == "postgresql" and not options["no_copy"]
+        )
+        self.prefix = f"seed{options['seed']}"
+        self.now = timezone.now()
+
+        ingredient_ids = list(
+            Ingredient.objects.order_by("id").values_list("id", flat=True)
+        )
+        if len(ingredient_ids) < MAX_INGREDIENTS:
+            raise CommandError(
+                "Сначала загрузите ингредиенты командой load_csv"
+            )
+        if User.objects.filter(username__startswith=self.prefix).exists():
+            raise CommandError(
+                f"Данные с зерном {options['seed']} уже загружены"
+            )
+
+        with transaction.atomic():
+            tag_ids = self.get_tags()
+            user_ids = self.create_users(options["users"])
+            recipe_ids = self.create_recipes(
+                options["recipes"], user_ids, tag_ids, ingredient_ids
+            )
+            self.create_pairs(
+                FavoriteRecipe, options["favorites"], user_ids, recipe_ids
+            )
+            self.create_pairs(
+                ShoppingCart, options["carts"], user_ids, recipe_ids
+            )
+            trending.rebuild()
+            self.create_subscriptions(options["subscriptions"], user_ids)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Создано: {len(user_ids)} пользователей, "
+                f"{len(recipe_ids)} рецептов"
+            )
+        )
+
+    def insert(self, model, columns, rows):
+        """Пакетная вставка кортежей значений в таблицу модели."""
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                self.flush(model, columns, batch)
+                batch = []
+        if batch:
+            self.flush(model, columns, batch)
+
+    def flush(self, model, columns, batch):
+        if not self.use_copy:
+            model.objects.bulk_create(
+                model(**dict(zip(columns, row))) for row in batch
+            )
+            return
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(batch)
+        buffer.seek(0)
+        table = connection.ops.quote_name(model._meta.db_table)
+        fields = ", ".join(connection.ops.quote_name(c) for c in columns)
+        with connection.cursor() as cursor:
+            cursor.copy_expert(
+                f"COPY {table} ({fields}) FROM STDIN WITH (FORMAT csv)",
+                buffer,
+            )
+
+    def get_tags(self):
+        if not Tag.objects.exists():
+            Tag.objects.bulk_create(
+                Tag(name=name, color=color, slug=slug)
+                for name, color, slug in DEFAULT_TAGS
+            )
+        return list(Tag.objects.order_by("id").values_list("id", flat=True))
+
+    def create_users(self, count):
+        password = make_password(self.prefix)
+        columns = (
+            "username", "email", "first_name", "last_name", "password",
+            "role", "is_superuser", "is_staff", "is_active", "date_joined",
+        )
+        self.insert(
+            User,
+            columns,
+            (
+                (
+                    f"{self.prefix}_{number}",
+                    f"{self.prefix}_{number}@example.com",
+                    f"Имя{number}",
+                    f"Фамилия{number}",
+                    password,
+                    User.Role.USER,
+                    False,
+                    False,
+                    True,
+                    self.now,
+                )
+                for number in range(count)
+            ),
+        )
+        return list(
+            User.objects.filter(username__startswith=f"{self.prefix}_")
+            .order_by("id")
+            .values_list("id", flat=True)
+        )
+
+    def create_recipes(self, count, user_ids, tag_ids, ingredient_ids):
+        if not count or not user_ids:
+            return []
+        pick_author = Zipf(self.rng, len(user_ids), self.exponent)
+        authors = [user_ids[pick_author()] for _ in range(count)]
+        self.insert(
+            Recipe,
+            (
+                "author_id", "name", "image", "text", "cooking_time",
+                "pub_date", "updated_at", "trending_score", "portions",
+                *nutrition.NUTRIENTS,
+            ),
+            (
+                (
+                    author_id,
+                    f"Рецепт {number}",
+                    "recipes/seed.png",
+                    " ".join(self.rng.choices(WORDS, k=30)),
+                    self.rng.randint(5, 180),
+                    self.now,
+                    self.now,
+                    0.0,
+                    1,
+                    *(0.0 for _ in nutrition.NUTRIENTS),
+                )
+                for number, author_id in enumerate(authors)
+            ),
+        )
+        recipe_ids = list(
+            Recipe.objects.filter(
+                author__username__startswith=f"{self.prefix}_"
+            )
+            .order_by("id")
+            .values_list("id", flat=True)
+        )
+
+        self.insert(
+            Recipe.tags.through,
+            ("recipe_id", "tag_id"),
+            (
+                (recipe_id, tag_id)
+                for recipe_id in recipe_ids
+                for tag_id in self.rng.sample(
+                    tag_ids, self.rng.randint(1, min(3, len(tag_ids)))
+                )
+            ),
+        )
+
+        pick_ingredient = Zipf(self.rng, len(ingredient_ids), self.exponent)
+
+        def recipe_ingredients(recipe_id):
+            size = self.rng.randint(MIN_INGREDIENTS, MAX_INGREDIENTS)
+            chosen = {}
+            while len(chosen) < size:
+                chosen.setdefault(ingredient_ids[pick_ingredient()], None)
+            for ingredient_id in chosen:
+                yield recipe_id, ingredient_id, self.rng.randint(1, 500)
+
+        self.insert(
+            IngredientsRecipe,
+            ("recipe_id", "ingredient_id", "amount"),
+            (
+                row
+                for recipe_id in recipe_ids
+                for row in recipe_ingredients(recipe_id)
+            ),
+        )
+        nutrition.recompute(recipe_ids)
+        search.refresh_usage()
+        return recipe_ids
+
+    def unique_pairs(self, count, pick_left, pick_right, exclude_equal=False):
+        """Уникальные пары (left, right) с ограничением числа попыток."""
+        seen = set()
+        attempts = 0
+        while len(seen) < count and attempts < count * 10:
+            attempts += 1
+            pair = (pick_left(), pick_right())
+            if exclude_equal and pair[0] == pair[1]:
+                continue
+            if pair not in seen:
+                seen.add(pair)
+                yield pair
+
+    def create_pairs(self, model, count, user_ids, recipe_ids):
+        if not count or not user_ids or not recipe_ids:
+            return
+        pick_recipe = Zipf(self.rng, len(recipe_ids), self.exponent)
+        self.insert(
+            model,
+            ("user_id", "recipe_id"),
+            self.unique_pairs(
+                count,
+                lambda: self.rng.choice(user_ids),
+                lambda: recipe_ids[pick_recipe()],
+            ),
+        )
+
+    def create_subscriptions(self, count, user_ids):
+        if not count or len(user_ids) < 2:
+            return
+        pick_author = Zipf(self.rng, len(user_ids), self.exponent)
+        self.insert(
+            Subscribe,
+            ("user_id", "author_id"),
+            self.unique_pairs(
+                count,
+                lambda: self.rng.choice(user_ids),
+                lambda: user_ids[pick_author()],
+                exclude_equal=True,
+            ),
+        )
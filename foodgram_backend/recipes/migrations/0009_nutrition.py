@@ -0,0 +1,58 @@
+# Generated by Django 3.2.16 on 2026-10-19 16:24
+
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_admin_search_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngredientNutrition',
+            fields=[
+                ('ingredient', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='nutrition', serialize=False, to='recipes.ingredient', verbose_name='Ингредиент')),
+                ('calories', models.FloatField(validators=[django.core.validators.MinValueValidator(0)], verbose_name='Калорийность, ккал')),
+                ('proteins', models.FloatField(validators=[django.core.validators.MinValueValidator(0)], verbose_name='Белки, г')),
+                ('fats', models.FloatField(validators=[django.core.validators.MinValueValidator(0)], verbose_name='Жиры, г')),
+                ('carbohydrates', models.FloatField(validators=[django.core.validators.MinValueValidator(0)], verbose_name='Углеводы, г')),
+            ],
+            options={
+                'verbose_name': 'Пищевая ценность',
+                'verbose_name_plural': 'Пищевая ценность',
+            },
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='calories',
+            field=models.FloatField(default=0, editable=False, verbose_name='Калорийность, ккал'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='carbohydrates',
+            field=models.FloatField(default=0, editable=False, verbose_name='Углеводы, г'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='fats',
+            field=models.FloatField(default=0, editable=False, verbose_name='Жиры, г'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='portions',
+            field=models.PositiveSmallIntegerField(default=1, validators=[django.core.validators.MinValueValidator(1, message='Количество порций не может быть меньше 1'), django.core.validators.MaxValueValidator(100, message='Количество порций не может быть больше 100')], verbose_name='Количество порций'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='proteins',
+            field=models.FloatField(default=0, editable=False, verbose_name='Белки, г'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['calories', '-pub_date'], name='recipe_calories_idx'),
+        ),
+    ]
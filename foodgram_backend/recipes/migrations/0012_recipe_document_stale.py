@@ -0,0 +1,22 @@
+# Generated by Django 3.2.16 on 2026-10-19 16:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0011_recipe_document'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipedocument',
+            name='stale',
+            field=models.BooleanField(default=False, verbose_name='Устарел'),
+        ),
+        migrations.AddIndex(
+            model_name='recipedocument',
+            index=models.Index(condition=models.Q(('stale', True)), fields=['recipe'], name='recipe_document_stale_idx'),
+        ),
+    ]
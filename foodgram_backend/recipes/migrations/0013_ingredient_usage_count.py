@@ -0,0 +1,37 @@
+# Generated by Django 3.2.16 on 2026-10-19 16:57
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_usage(apps, schema_editor):
+    Ingredient = apps.get_model('recipes', 'Ingredient')
+    IngredientsRecipe = apps.get_model('recipes', 'IngredientsRecipe')
+    Ingredient.objects.update(
+        usage_count=Coalesce(
+            Subquery(
+                IngredientsRecipe.objects.filter(ingredient=OuterRef('pk'))
+                .values('ingredient')
+                .annotate(total=Count('id'))
+                .values('total')
+            ),
+            0,
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0012_recipe_document_stale'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingredient',
+            name='usage_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Число рецептов'),
+        ),
+        migrations.RunPython(count_usage, migrations.RunPython.noop),
+    ]
@@ -1,3 +1,5 @@
+from decimal import Decimal
+
 from colorfield.fields import ColorField
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
@@ -8,6 +10,10 @@ MIN_VALUE_COOKING_TIME = 1
 MAX_VALUE_COOKING_TIME = 32000
 MIN_VALUE_AMOUNT = 1
 MAX_VALUE_AMOUNT = 32000
+MIN_VALUE_SERVINGS = Decimal("0.25")
+MAX_VALUE_SERVINGS = 100
+MIN_VALUE_PORTIONS = 1
+MAX_VALUE_PORTIONS = 100
 
 
 class Ingredient(models.Model):
@@ -19,6 +25,10 @@ class Ingredient(models.Model):
     measurement_unit = models.CharField(
         max_length=200, verbose_name="Единицы измерения"
     )
+    usage_count = models.PositiveIntegerField(
+        "Число рецептов", default=0, editable=False
+    )
+    updated_at = models.DateTimeField("Дата изменения", auto_now=True)
 
     class Meta:
         ordering = ("name",)
@@ -26,11 +36,43 @@ class Ingredient(models.Model):
             "name",
             "measurement_unit",
         )
+        indexes = [
+            models.Index(
+                fields=["updated_at", "id"], name="ingredient_updated_idx"
+            ),
+        ]
 
     def __str__(self):
         return f"{self.name} - {self.measurement_unit}"
 
 
+class IngredientNutrition(models.Model):
+    """Пищевая ценность одной единицы измерения ингредиента"""
+
+    ingredient = models.OneToOneField(
+        Ingredient,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="nutrition",
+        verbose_name="Ингредиент",
+    )
+    calories = models.FloatField(
+        "Калорийность, ккал", validators=[MinValueValidator(0)]
+    )
+    proteins = models.FloatField("Белки, г", validators=[MinValueValidator(0)])
+    fats = models.FloatField("Жиры, г", validators=[MinValueValidator(0)])
+    carbohydrates = models.FloatField(
+        "Углеводы, г", validators=[MinValueValidator(0)]
+    )
+
+    class Meta:
+        verbose_name = "Пищевая ценность"
+        verbose_name_plural = "Пищевая ценность"
+
+    def __str__(self):
+        return str(self.ingredient)
+
+
 class Tag(models.Model):
     """Модель тега"""
 
@@ -39,9 +81,13 @@ class Tag(models.Model):
     )
     color = ColorField(unique=True, format="hex", verbose_name="Цвет")
     slug = models.SlugField(max_length=200, unique=True, verbose_name="Слаг")
+    updated_at = models.DateTimeField("Дата изменения", auto_now=True)
 
     class Meta:
         ordering = ("name",)
+        indexes = [
+            models.Index(fields=["updated_at", "id"], name="tag_updated_idx"),
+        ]
 
     def __str__(self):
         return self.name
@@ -84,9 +130,52 @@ class Recipe(models.Model):
         verbose_name="Ингредиенты",
     )
     pub_date = models.DateTimeField("Дата публикации", auto_now_add=True)
+    updated_at = models.DateTimeField("Дата изменения", auto_now=True)
+    trending_score = models.FloatField(
+        "Популярность", default=0, editable=False
+    )
+    portions = models.PositiveSmallIntegerField(
+        "Количество порций",
+        default=1,
+        validators=[
+            MinValueValidator(
+                MIN_VALUE_PORTIONS,
+                message="Количество порций не может быть меньше 1",
+            ),
+            MaxValueValidator(
+                MAX_VALUE_PORTIONS,
+                message="Количество порций не может быть больше 100",
+            ),
+        ],
+    )
+    calories = models.FloatField(
+        "Калорийность, ккал", default=0, editable=False
+    )
+    proteins = models.FloatField("Белки, г", default=0, editable=False)
+    fats = models.FloatField("Жиры, г", default=0, editable=False)
+    carbohydrates = models.FloatField(
+        "Углеводы, г", default=0, editable=False
+    )
 
     class Meta:
         ordering = ("-pub_date",)
+        indexes = [
+            models.Index(
+                fields=["-trending_score", "-pub_date"],
+                name="recipe_trending_idx",
+            ),
+            models.Index(
+                fields=["calories", "-pub_date"],
+                name="recipe_calories_idx",
+            ),
+            models.Index(
+                fields=["updated_at", "id"], name="recipe_updated_idx"
+            ),
+            models.Index(
+                fields=["author", "-pub_date"],
+                name="recipe_author_pub_date_idx",
+            ),
+        ]
         verbose_name = "Рецепт"
         verbose_name_plural = "Рецепты"
 
@@ -195,3 +284,226 @@ class ShoppingCart(models.Model):
             f"- {self.user.last_name}"
             f"- {self.recipe.name}"
         )
+
+
+class FeedEntry(models.Model):
+    """Модель ленты рецептов авторов, на которых подписан пользователь"""
+
+    user = models.ForeignKey(
+        User,
+        related_name="feed",
+        on_delete=models.CASCADE,
+        verbose_name="Подписчик",
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        related_name="feed_entries",
+        on_delete=models.CASCADE,
+        verbose_name="Рецепт",
+    )
+    author = models.ForeignKey(
+        User,
+        related_name="+",
+        on_delete=models.CASCADE,
+        verbose_name="Автор",
+    )
+    pub_date = models.DateTimeField("Дата публикации")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "recipe"], name="unique_feed_entry"
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["user", "-pub_date"], name="feed_user_pub_date_idx"
+            ),
+        ]
+        verbose_name = "Запись ленты"
+        verbose_name_plural = "Лента"
+
+    def __str__(self):
+        return f"{self.user_id} - {self.recipe_id}"
+
+
+class RecipeSignature(models.Model):
+    """Модель MinHash-сигнатуры набора ингредиентов рецепта"""
+
+    recipe = models.OneToOneField(
+        Recipe,
+        primary_key=True,
+        related_name="signature",
+        on_delete=models.CASCADE,
+        verbose_name="Рецепт",
+    )
+    minhash = models.BinaryField("Сигнатура")
+
+    def __str__(self):
+        return f"{self.recipe_id}"
+
+
+class RecipeBucket(models.Model):
+    """Модель LSH-корзины рецепта"""
+
+    recipe = models.ForeignKey(
+        Recipe,
+        related_name="buckets",
+        on_delete=models.CASCADE,
+        verbose_name="Рецепт",
+    )
+    band = models.PositiveSmallIntegerField("Полоса")
+    bucket = models.BigIntegerField("Корзина")
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["band", "bucket"], name="recipe_bucket_lookup_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.recipe_id} - {self.band} - {self.bucket}"
+
+
+class MealPlan(models.Model):
+    """Модель плана питания"""
+
+    user = models.ForeignKey(
+        User,
+        related_name="meal_plans",
+        on_delete=models.CASCADE,
+        verbose_name="Пользователь",
+    )
+    name = models.CharField(max_length=200, verbose_name="Название плана")
+    start_date = models.DateField("Начало недели")
+
+    class Meta:
+        ordering = ("-start_date",)
+        verbose_name = "План питания"
+        verbose_name_plural = "Планы питания"
+
+    def __str__(self):
+        return self.name
+
+
+class MealPlanItem(models.Model):
+    """Модель рецепта в плане питания"""
+
+    class Day(models.IntegerChoices):
+        MONDAY = 0, "Понедельник"
+        TUESDAY = 1, "Вторник"
+        WEDNESDAY = 2, "Среда"
+        THURSDAY = 3, "Четверг"
+        FRIDAY = 4, "Пятница"
+        SATURDAY = 5, "Суббота"
+        SUNDAY = 6, "Воскресенье"
+
+    plan = models.ForeignKey(
+        MealPlan,
+        related_name="items",
+        on_delete=models.CASCADE,
+        verbose_name="План питания",
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        related_name="meal_plan_items",
+        on_delete=models.CASCADE,
+        verbose_name="Рецепт",
+    )
+    day = models.PositiveSmallIntegerField(
+        choices=Day.choices, verbose_name="День недели"
+    )
+    servings = models.DecimalField(
+        max_digits=5,
+        decimal_places=2,
+        default=1,
+        verbose_name="Множитель порций",
+        validators=[
+            MinValueValidator(
+                MIN_VALUE_SERVINGS,
+                message="Множитель порций не может быть меньше 0.25",
+            ),
+            MaxValueValidator(
+                MAX_VALUE_SERVINGS,
+                message="Множитель порций не может быть больше 100",
+            ),
+        ],
+    )
+
+    class Meta:
+        ordering = ("day", "id")
+        verbose_name = "Рецепт в плане"
+        verbose_name_plural = "Рецепты в плане"
+
+    def __str__(self):
+        return f"{self.plan} - {self.recipe} - {self.servings}"
+
+
+class RecipeDocument(models.Model):
+    """Готовое представление рецепта без полей текущего пользователя"""
+
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="document",
+        verbose_name="Рецепт",
+    )
+    data = models.JSONField("Документ")
+    rendered_at = models.DateTimeField("Дата построения", auto_now=True)
+    stale = models.BooleanField("Устарел", default=False)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["recipe"],
+                condition=models.Q(stale=True),
+                name="recipe_document_stale_idx",
+            ),
+        ]
+        verbose_name = "Документ рецепта"
+        verbose_name_plural = "Документы рецептов"
+
+    def __str__(self):
+        return str(self.recipe_id)
+
+
+class Tombstone(models.Model):
+    """Запись об удалённом объекте для синхронизации клиентов"""
+
+    class Kind(models.TextChoices):
+        RECIPE = "recipes", "Рецепт"
+        TAG = "tags", "Тег"
+        INGREDIENT = "ingredients", "Ингредиент"
+
+    kind = models.CharField("Тип объекта", max_length=20, choices=Kind.choices)
+    object_id = models.BigIntegerField("Идентификатор объекта")
+    deleted_at = models.DateTimeField("Дата удаления", auto_now_add=True)
+
+    class Meta:
+        ordering = ("deleted_at", "id")
+        indexes = [
+            models.Index(
+                fields=["deleted_at", "id"], name="tombstone_deleted_idx"
+            ),
+        ]
+        verbose_name = "Удалённый объект"
+        verbose_name_plural = "Удалённые объекты"
+
+    def __str__(self):
+        return f"{self.kind} #{self.object_id}"
+
+
+class Generation(models.Model):
+    """Поколение данных, входящее в ключи кэша"""
+
+    key = models.CharField("Ключ", max_length=100, primary_key=True)
+    value = models.BigIntegerField("Значение")
+
+    class Meta:
+        verbose_name = "Поколение данных"
+        verbose_name_plural = "Поколения данных"
+
+    def __str__(self):
+        return f"{self.key}: {self.value}"
@@ -0,0 +1,85 @@
+from django.db import transaction
+from django.db.models import F, FloatField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from jobs.queue import task
+
+from . import documents, facets
+from .models import IngredientsRecipe, Recipe
+
+NUTRIENTS = ("calories", "proteins", "fats", "carbohydrates")
+BACKFILL_BATCH_SIZE = 1000
+
+
+def total(nutrient):
+    """Подзапрос суммы нутриента по ингредиентам рецепта."""
+    return Coalesce(
+        Subquery(
+            IngredientsRecipe.objects.filter(recipe=OuterRef("pk"))
+            .values("recipe")
+            .annotate(
+                total=Sum(
+                    F("amount") * F(f"ingredient__nutrition__{nutrient}"),
+                    output_field=FloatField(),
+                )
+            )
+            .values("total")
+        ),
+        0.0,
+    )
+
+
+def recompute(recipe_ids):
+    """Пересчитывает сохранённые итоги у рецептов одним запросом."""
+    return Recipe.objects.filter(id__in=recipe_ids).update(
+        updated_at=timezone.now(),
+        **{nutrient: total(nutrient) for nutrient in NUTRIENTS},
+    )
+
+
+def per_portion(recipe):
+    return {
+        nutrient: round(getattr(recipe, nutrient) / recipe.portions, 1)
+        for nutrient in NUTRIENTS
+    }
+
+
+@task
+def refresh(recipe_ids):
+    """Пересчитывает итоги рецептов и их документы после правки состава."""
+    with transaction.atomic():
+        recompute(recipe_ids)
+    documents.render(recipe_ids)
+    facets.bump_generation()
+
+
+@task
+def backfill(ingredient_ids=None):
+    """Пересчитывает пачками рецепты с изменившимися ингредиентами.
+
+    Без ingredient_ids пересчитываются все рецепты.
+    """
+    recipes = Recipe.objects.order_by("id")
+    if ingredient_ids is not None:
+        recipes = recipes.filter(
+            id__in=IngredientsRecipe.objects.filter(
+                ingredient_id__in=ingredient_ids
+            ).values("recipe_id")
+        )
+    last_id = 0
+    updated = 0
+    while True:
+        batch = list(
+            recipes.filter(id__gt=last_id).values_list("id", flat=True)[
+                :BACKFILL_BATCH_SIZE
+            ]
+        )
+        if not batch:
+            if updated:
+                facets.bump_generation()
+            return updated
+        with transaction.atomic():
+            updated += recompute(batch)
+        documents.render(batch)
+        last_id = batch[-1]
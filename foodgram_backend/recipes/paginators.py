@@ -0,0 +1,57 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+
+def table_estimate(queryset):
+    """Оценка числа строк таблицы из статистики PostgreSQL."""
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(
+            "SELECT reltuples::bigint FROM pg_class "
+            "WHERE oid = to_regclass(%s)",
+            [queryset.model._meta.db_table],
+        )
+        row = cursor.fetchone()
+    if row is None or row[0] < 0:
+        return None
+    return row[0]
+
+
+def planner_estimate(queryset):
+    """Оценка числа строк запроса по плану PostgreSQL, кешируется."""
+    sql, params = queryset.query.sql_with_params()
+    key = "count:" + hashlib.md5(f"{sql}{params}".encode()).hexdigest()
+    estimate = cache.get(key)
+    if estimate is None:
+        with connections[queryset.db].cursor() as cursor:
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        estimate = int(plan[0]["Plan"]["Plan Rows"])
+        cache.set(key, estimate, settings.ESTIMATED_COUNT_TTL)
+    return estimate
+
+
+class EstimatedCountPaginator(Paginator):
+    """Пагинатор, заменяющий COUNT(*) оценкой на больших выборках"""
+
+    exact = True
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if connections[queryset.db].vendor == "postgresql":
+            if queryset.query.where:
+                estimate = planner_estimate(queryset)
+            else:
+                estimate = table_estimate(queryset)
+            if estimate and estimate > settings.EXACT_COUNT_THRESHOLD:
+                self.exact = False
+                return estimate
+        return super().count
@@ -0,0 +1,221 @@
+import logging
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from math import log1p
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from jobs.queue import task
+
+from .models import Ingredient, IngredientsRecipe
+
+logger = logging.getLogger(__name__)
+
+LATIN = "qwertyuiop[]asdfghjkl;'zxcvbnm,.`"
+CYRILLIC = "йцукенгшщзхъфывапролджэячсмитьбюё"
+TO_CYRILLIC = str.maketrans(LATIN, CYRILLIC)
+TO_LATIN = str.maketrans(CYRILLIC, LATIN)
+
+# Вклад популярности в итоговый рейтинг относительно точности совпадения.
+POPULARITY_WEIGHT = 0.3
+MIN_SIMILARITY = 0.6
+CANDIDATE_LIMIT = 200
+
+
+def normalize(text):
+    return " ".join(text.lower().replace("ё", "е").split())
+
+
+def variants(query):
+    """Запрос и его вариант в другой раскладке клавиатуры."""
+    query = query.lower()
+    result = [normalize(query)]
+    for table in (TO_CYRILLIC, TO_LATIN):
+        converted = normalize(query.translate(table))
+        if converted not in result:
+            result.append(converted)
+    return [variant for variant in result if variant]
+
+
+def trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def prefix_distance(query, name, limit):
+    """Наименьшее расстояние Левенштейна от запроса до начала названия
+    или любого его слова; при превышении limit возвращает limit + 1.
+    """
+    best = limit + 1
+    size = len(query) + 1
+    for start in [0] + [i + 1 for i, c in enumerate(name) if c == " "]:
+        part = name[start:start + size]
+        previous = list(range(len(part) + 1))
+        for i, char in enumerate(query, 1):
+            current = [i]
+            for j, other in enumerate(part, 1):
+                current.append(
+                    min(
+                        previous[j] + 1,
+                        current[j - 1] + 1,
+                        previous[j - 1] + (char != other),
+                    )
+                )
+            previous = current
+            if min(current) >= best:
+                break
+        else:
+            best = min(best, *previous[max(len(query) - 1, 0):])
+            if not best:
+                break
+    return best
+
+
+class IngredientIndex:
+    """Триграммный индекс названий ингредиентов в памяти процесса."""
+
+    def __init__(self):
+        rows = list(
+            Ingredient.objects.values_list("id", "name", "usage_count")
+        )
+        top = log1p(max((usage for *_, usage in rows), default=0)) or 1
+        self.names = {pk: normalize(name) for pk, name, _ in rows}
+        self.popularity = {pk: log1p(usage) / top for pk, _, usage in rows}
+        self.sorted_names = sorted(
+            (name, pk) for pk, name in self.names.items()
+        )
+        self.postings = defaultdict(list)
+        for pk, name in self.names.items():
+            for gram in trigrams(name):
+                self.postings[gram].append(pk)
+        self.built = time.monotonic()
+
+    def prefix_matches(self, query):
+        position = bisect_left(self.sorted_names, (query,))
+        while position < len(self.sorted_names):
+            name, pk = self.sorted_names[position]
+            if not name.startswith(query):
+                break
+            yield pk
+            position += 1
+
+    def candidates(self, query):
+        counts = Counter()
+        for gram in trigrams(query):
+            counts.update(self.postings.get(gram, ()))
+        return [pk for pk, _ in counts.most_common(CANDIDATE_LIMIT)]
+
+    def search(self, query, limit, budget):
+        """Идентификаторы ингредиентов по убыванию рейтинга.
+
+        Кандидаты проверяются по порядку триграммного сходства, пока не
+        истечёт бюджет времени budget (в секундах).
+        """
+        deadline = time.monotonic() + budget
+        scores = {}
+        for variant in variants(query):
+            for pk in self.prefix_matches(variant):
+                scores[pk] = 1 + POPULARITY_WEIGHT * self.popularity[pk]
+        for variant in variants(query):
+            allowed = int(len(variant) * (1 - MIN_SIMILARITY))
+            for pk in self.candidates(variant):
+                if time.monotonic() > deadline:
+                    break
+                if pk in scores:
+                    continue
+                errors = prefix_distance(variant, self.names[pk], allowed)
+                if errors <= allowed:
+                    scores[pk] = (
+                        1
+                        - errors / len(variant)
+                        + POPULARITY_WEIGHT * self.popularity[pk]
+                    )
+        return sorted(scores, key=scores.get, reverse=True)[:limit]
+
+
+@task
+def refresh_usage():
+    """Пересчитывает, в скольких рецептах встречается каждый ингредиент."""
+    Ingredient.objects.update(
+        usage_count=Coalesce(
+            Subquery(
+                IngredientsRecipe.objects.filter(ingredient=OuterRef("pk"))
+                .values("ingredient")
+                .annotate(total=Count("id"))
+                .values("total")
+            ),
+            0,
+        )
+    )
+
+
+def schedule_usage_refresh():
+    """Откладывает пересчёт, чтобы серия изменений дала один запуск."""
+    refresh_usage.enqueue(
+        dedupe_key="search:usage",
+        delay=settings.INGREDIENT_USAGE_REFRESH_DELAY,
+    )
+
+
+_lock = threading.Lock()
+_index = None
+_stale = False
+_building = False
+
+
+def rebuild_index():
+    global _index, _building
+    try:
+        index = IngredientIndex()
+        with _lock:
+            _index = index
+    except Exception:
+        logger.exception("Ingredient index rebuild failed")
+    finally:
+        with _lock:
+            _building = False
+        connection.close()
+
+
+def get_index():
+    """Индекс ингредиентов процесса.
+
+    Синхронно строится только первый индекс; устаревший перестраивается
+    в отдельном потоке, а запросы тем временем обслуживает прежний.
+    """
+    global _index, _stale, _building
+    with _lock:
+        if _index is None:
+            _index = IngredientIndex()
+            _stale = False
+        elif not _building and (
+            _stale
+            or time.monotonic() - _index.built
+            > settings.INGREDIENT_INDEX_TTL
+        ):
+            _stale = False
+            _building = True
+            threading.Thread(
+                target=rebuild_index, name="ingredient-index", daemon=True
+            ).start()
+        return _index
+
+
+def reset_index():
+    """Помечает индекс устаревшим; он перестроится при следующем поиске."""
+    global _stale
+    with _lock:
+        _stale = True
+
+
+def search_ingredients(query):
+    return get_index().search(
+        query,
+        settings.INGREDIENT_SEARCH_LIMIT,
+        settings.INGREDIENT_SEARCH_BUDGET_MS / 1000,
+    )
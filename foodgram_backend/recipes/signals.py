@@ -0,0 +1,136 @@
+from django.db import transaction
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+)
+from django.dispatch import receiver
+
+from users.models import Subscribe, User
+
+from . import documents, facets, feed, nutrition, search, sync, trending
+from .models import (
+    FavoriteRecipe,
+    Ingredient,
+    IngredientNutrition,
+    IngredientsRecipe,
+    Recipe,
+    ShoppingCart,
+    Tag,
+    Tombstone,
+)
+
+
+@receiver(post_save, sender=Recipe)
+def fan_out_recipe(sender, instance, created, **kwargs):
+    if created:
+        feed.fan_out.enqueue(
+            instance.id, dedupe_key=f"feed:fan_out:{instance.id}"
+        )
+
+
+@receiver(post_save, sender=Subscribe)
+def backfill_feed(sender, instance, created, **kwargs):
+    if created:
+        feed.backfill.enqueue(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Subscribe)
+def clean_feed(sender, instance, **kwargs):
+    feed.remove_author(instance.user_id, instance.author_id)
+
+
+def trending_weight(sender):
+    if sender is FavoriteRecipe:
+        return trending.FAVORITE_WEIGHT
+    return trending.SHOPPING_CART_WEIGHT
+
+
+@receiver(post_save, sender=FavoriteRecipe)
+@receiver(post_save, sender=ShoppingCart)
+def raise_trending(sender, instance, created, **kwargs):
+    if created:
+        trending.bump([instance.recipe_id], trending_weight(sender))
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def reset_search_index(sender, **kwargs):
+    search.reset_index()
+
+
+@receiver(post_save, sender=IngredientNutrition)
+@receiver(post_delete, sender=IngredientNutrition)
+def recompute_nutrition(sender, instance, **kwargs):
+    nutrition.backfill.enqueue(
+        [instance.ingredient_id],
+        dedupe_key=f"nutrition:{instance.ingredient_id}",
+    )
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def bump_facets_generation(sender, **kwargs):
+    facets.bump_generation()
+
+
+@receiver(post_save, sender=FavoriteRecipe)
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_delete, sender=FavoriteRecipe)
+@receiver(post_delete, sender=ShoppingCart)
+def bump_user_facets_generation(sender, instance, **kwargs):
+    facets.bump_generation(
+        facets.USER_GENERATION_KEY.format(instance.user_id)
+    )
+
+
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def record_tombstone(sender, instance, **kwargs):
+    kinds = {model: kind for kind, model in sync.STREAMS.items()}
+    Tombstone.objects.create(kind=kinds[sender], object_id=instance.pk)
+
+
+@receiver(post_save, sender=Recipe)
+def render_document(sender, instance, **kwargs):
+    transaction.on_commit(lambda: documents.render([instance.id]))
+
+
+def invalidate_recipes(recipe_ids):
+    documents.invalidate(recipe_ids)
+    sync.touch(recipe_ids)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(pre_delete, sender=Tag)
+def invalidate_tag_documents(sender, instance, **kwargs):
+    invalidate_recipes(
+        Recipe.tags.through.objects.filter(tag=instance).values("recipe_id")
+    )
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(pre_delete, sender=Ingredient)
+def invalidate_ingredient_documents(sender, instance, **kwargs):
+    invalidate_recipes(
+        IngredientsRecipe.objects.filter(ingredient=instance).values(
+            "recipe_id"
+        )
+    )
+
+
+AUTHOR_DOCUMENT_FIELDS = {"email", "username", "first_name", "last_name"}
+
+
+@receiver(post_save, sender=User)
+def invalidate_author_documents(sender, instance, created, **kwargs):
+    update_fields = kwargs.get("update_fields")
+    if created or (
+        update_fields is not None
+        and not AUTHOR_DOCUMENT_FIELDS & set(update_fields)
+    ):
+        return
+    invalidate_recipes(Recipe.objects.filter(author=instance).values("id"))
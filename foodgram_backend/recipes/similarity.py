@@ -0,0 +1,142 @@
+from itertools import groupby
+from operator import itemgetter
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Count, Q
+
+from jobs.queue import task
+
+from .models import IngredientsRecipe, Recipe, RecipeBucket, RecipeSignature
+
+NUM_PERM = 64
+BANDS = 32
+ROWS = NUM_PERM // BANDS
+PRIME = (1 << 31) - 1
+CANDIDATE_LIMIT = 200
+BUILD_BATCH_SIZE = 2000
+
+_random = np.random.RandomState(20230922)
+COEF_A = _random.randint(1, PRIME, NUM_PERM, dtype=np.uint64)
+COEF_B = _random.randint(0, PRIME, NUM_PERM, dtype=np.uint64)
+BAND_MIX = _random.randint(1, 1 << 62, ROWS, dtype=np.uint64) | np.uint64(1)
+
+
+def signatures(ingredient_sets):
+    """MinHash-сигнатуры пачки непустых наборов ингредиентов."""
+    lengths = np.fromiter(
+        (len(ids) for ids in ingredient_sets),
+        dtype=np.int64,
+        count=len(ingredient_sets),
+    )
+    ids = np.fromiter(
+        (pk for ids in ingredient_sets for pk in ids),
+        dtype=np.uint64,
+        count=int(lengths.sum()),
+    )
+    hashes = (ids[:, None] * COEF_A + COEF_B) % PRIME
+    offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    return np.minimum.reduceat(hashes, offsets, axis=0).astype(np.uint32)
+
+
+def band_buckets(minhashes):
+    """Ключи LSH-корзин: по одному на каждую полосу сигнатуры."""
+    bands = minhashes.astype(np.uint64).reshape(-1, BANDS, ROWS)
+    return (bands * BAND_MIX).sum(axis=2).view(np.int64)
+
+
+def to_bytes(minhash):
+    return minhash.astype("<u4").tobytes()
+
+
+def from_bytes(data):
+    return np.frombuffer(bytes(data), dtype="<u4")
+
+
+def write_index(recipe_ids, minhashes):
+    buckets = band_buckets(minhashes)
+    RecipeSignature.objects.bulk_create(
+        RecipeSignature(recipe_id=recipe_id, minhash=to_bytes(minhash))
+        for recipe_id, minhash in zip(recipe_ids, minhashes)
+    )
+    RecipeBucket.objects.bulk_create(
+        (
+            RecipeBucket(recipe_id=recipe_id, band=band, bucket=int(key))
+            for recipe_id, keys in zip(recipe_ids, buckets)
+            for band, key in enumerate(keys)
+        ),
+        batch_size=BUILD_BATCH_SIZE,
+    )
+
+
+@transaction.atomic
+def index_recipe(recipe, ingredient_ids):
+    """Обновляет сигнатуру и корзины одного рецепта."""
+    RecipeSignature.objects.filter(recipe=recipe).delete()
+    RecipeBucket.objects.filter(recipe=recipe).delete()
+    if ingredient_ids:
+        write_index([recipe.id], signatures([ingredient_ids]))
+
+
+@task
+def reindex(recipe_id):
+    """Переиндексирует рецепт по его текущему составу."""
+    ingredient_ids = IngredientsRecipe.objects.filter(
+        recipe_id=recipe_id
+    ).values_list("ingredient_id", flat=True)
+    index_recipe(Recipe(id=recipe_id), list(ingredient_ids))
+
+
+@transaction.atomic
+def build():
+    """Полностью перестраивает индекс по всем рецептам."""
+    RecipeBucket.objects.all().delete()
+    RecipeSignature.objects.all().delete()
+    rows = (
+        IngredientsRecipe.objects.order_by("recipe_id")
+        .values_list("recipe_id", "ingredient_id")
+        .iterator(chunk_size=BUILD_BATCH_SIZE * 10)
+    )
+    recipe_ids, ingredient_sets = [], []
+    for recipe_id, group in groupby(rows, key=itemgetter(0)):
+        recipe_ids.append(recipe_id)
+        ingredient_sets.append([ingredient_id for _, ingredient_id in group])
+        if len(recipe_ids) >= BUILD_BATCH_SIZE:
+            write_index(recipe_ids, signatures(ingredient_sets))
+            recipe_ids, ingredient_sets = [], []
+    if recipe_ids:
+        write_index(recipe_ids, signatures(ingredient_sets))
+
+
+def similar_recipes(recipe, limit=10):
+    """Рецепты с наиболее похожим набором ингредиентов."""
+    signature = RecipeSignature.objects.filter(recipe=recipe).first()
+    if signature is None:
+        return []
+    minhash = from_bytes(signature.minhash)
+    lookup = Q()
+    for band, key in enumerate(band_buckets(minhash[None, :])[0]):
+        lookup |= Q(band=band, bucket=int(key))
+    candidates = list(
+        RecipeBucket.objects.filter(lookup)
+        .exclude(recipe=recipe)
+        .values("recipe")
+        .annotate(shared=Count("id"))
+        .order_by("-shared")
+        .values_list("recipe", flat=True)[:CANDIDATE_LIMIT]
+    )
+    if not candidates:
+        return []
+    rows = list(
+        RecipeSignature.objects.filter(recipe__in=candidates).values_list(
+            "recipe_id", "minhash"
+        )
+    )
+    if not rows:
+        return []
+    ids = [recipe_id for recipe_id, _ in rows]
+    matrix = np.vstack([from_bytes(data) for _, data in rows])
+    scores = (matrix == minhash).mean(axis=1)
+    best = [ids[i] for i in np.argsort(-scores, kind="stable")[:limit]]
+    recipes = Recipe.objects.in_bulk(best)
+    return [recipes[pk] for pk in best if pk in recipes]
@@ -0,0 +1,32 @@
+import hashlib
+import posixpath
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """Хранилище, именующее файлы по SHA-256 содержимого.
+
+    Одинаковые файлы сохраняются один раз, а имя никогда не указывает на
+    другое содержимое, поэтому URL можно кешировать как неизменяемые.
+    """
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, "chunks"):
+            content = File(content, name)
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        hexdigest = digest.hexdigest()
+        name = posixpath.join(
+            posixpath.dirname(name),
+            hexdigest[:2],
+            hexdigest + posixpath.splitext(name)[1].lower(),
+        )
+        if self.exists(name):
+            return name
+        return super().save(name, content, max_length)
@@ -0,0 +1,153 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core import signing
+from django.db import connections
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Ingredient, Recipe, Tag, Tombstone
+
+WATERMARK_SALT = "recipes.sync"
+STREAMS = {
+    Tombstone.Kind.RECIPE.value: Recipe,
+    Tombstone.Kind.TAG.value: Tag,
+    Tombstone.Kind.INGREDIENT.value: Ingredient,
+}
+DELETED = "deleted"
+
+
+class WatermarkExpired(Exception):
+    """Водяной знак старше хранимой истории удалений."""
+
+
+def encode(cursors):
+    return signing.dumps(
+        {
+            "issued": timezone.now().isoformat(),
+            "cursors": {
+                name: [timestamp.isoformat(), pk]
+                for name, (timestamp, pk) in cursors.items()
+            },
+        },
+        salt=WATERMARK_SALT,
+        compress=True,
+    )
+
+
+def decode(watermark):
+    """Курсоры (время, id) по потокам из выданного сервером знака.
+
+    Подделанный знак вызывает signing.BadSignature, устаревший —
+    WatermarkExpired.
+    """
+    if not watermark:
+        return {}
+    data = signing.loads(watermark, salt=WATERMARK_SALT)
+    if parse_datetime(data["issued"]) < timezone.now() - timedelta(
+        days=settings.SYNC_TOMBSTONE_DAYS
+    ):
+        raise WatermarkExpired
+    return {
+        name: (parse_datetime(timestamp), pk)
+        for name, (timestamp, pk) in data["cursors"].items()
+    }
+
+
+def page(queryset, field, cursor, limit, until):
+    """Следующие limit строк после курсора по индексу (field, id).
+
+    Строки новее until не отдаются: их транзакции могли ещё не завершиться,
+    и курсор не должен их обогнать.
+    """
+    queryset = queryset.filter(**{f"{field}__lt": until})
+    if cursor is not None:
+        timestamp, pk = cursor
+        queryset = queryset.filter(
+            Q(**{f"{field}__gt": timestamp})
+            | Q(**{field: timestamp, "id__gt": pk})
+        )
+    rows = list(queryset.order_by(field, "id")[: limit + 1])
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if rows:
+        cursor = (getattr(rows[-1], field), rows[-1].id)
+    return rows, cursor, has_more
+
+
+def settled_until():
+    """Время, до которого все изменения уже видны читателю.
+
+    В PostgreSQL граница не позже начала самой старой незавершённой
+    пишущей транзакции: её строки появятся позже, но с более ранним
+    updated_at. SYNC_SETTLE_SECONDS покрывает расхождение часов серверов
+    приложения и БД.
+    """
+    until = timezone.now()
+    connection = connections["default"]
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT min(xact_start) FROM pg_stat_activity "
+                "WHERE datname = current_database() "
+                "AND backend_xid IS NOT NULL AND pid <> pg_backend_pid()"
+            )
+            oldest = cursor.fetchone()[0]
+        if oldest is not None:
+            until = min(until, oldest)
+    return until - timedelta(seconds=settings.SYNC_SETTLE_SECONDS)
+
+
+def touch(recipe_ids):
+    """Сдвигает updated_at рецептов, чьё представление зависит от
+    изменённых авторов, тегов или ингредиентов."""
+    return Recipe.objects.filter(id__in=recipe_ids).update(
+        updated_at=timezone.now()
+    )
+
+
+def changes(cursors, limit, querysets=None):
+    """Изменённые объекты, удалённые id и новые курсоры по всем потокам.
+
+    querysets позволяет заменить выборку потока, например чтобы
+    подгрузить связи для сериализации.
+    """
+    querysets = querysets or {}
+    until = settled_until()
+    result = {}
+    next_cursors = {}
+    has_more = False
+    for name, model in STREAMS.items():
+        rows, cursor, more = page(
+            querysets.get(name, model.objects.all()),
+            "updated_at",
+            cursors.get(name),
+            limit,
+            until,
+        )
+        result[name] = rows
+        has_more |= more
+        if cursor is not None:
+            next_cursors[name] = cursor
+    tombstones, cursor, more = page(
+        Tombstone.objects.all(),
+        "deleted_at",
+        cursors.get(DELETED),
+        limit,
+        until,
+    )
+    has_more |= more
+    if cursor is not None:
+        next_cursors[DELETED] = cursor
+    deleted = {name: [] for name in STREAMS}
+    for tombstone in tombstones:
+        deleted[tombstone.kind].append(tombstone.object_id)
+    return result, deleted, next_cursors, has_more
+
+
+def purge_tombstones():
+    return Tombstone.objects.filter(
+        deleted_at__lt=timezone.now()
+        - timedelta(days=settings.SYNC_TOMBSTONE_DAYS)
+    ).delete()[0]
@@ -0,0 +1,117 @@
+from unittest import skipUnless
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIClient
+
+from users.models import User
+
+from . import facets, units
+from .models import Recipe, Tag
+
+
+@skipUnless(
+    connection.vendor == "postgresql", "GROUPING SETS есть только в PostgreSQL"
+)
+@override_settings(DATABASE_REPLICAS=[])
+class GroupedFacetCountsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.tags = Tag.objects.bulk_create(
+            Tag(name=name, color=color, slug=slug)
+            for name, color, slug in (
+                ("Завтрак", "#E26C2D", "breakfast"),
+                ("Обед", "#49B64E", "lunch"),
+                ("Ужин", "#8775D2", "dinner"),
+            )
+        )
+        cls.authors = [
+            User.objects.create_user(
+                username=f"author{number}",
+                email=f"author{number}@example.com",
+                password="pass",
+            )
+            for number in range(4)
+        ]
+        cooking_times = (5, 15, 16, 30, 45, 60, 90, 120, 121, 300)
+        author_numbers = (0, 0, 0, 0, 1, 1, 1, 2, 2, 3)
+        for number, cooking_time in enumerate(cooking_times):
+            recipe = Recipe.objects.create(
+                author=cls.authors[author_numbers[number]],
+                name=f"Рецепт {number}",
+                text="Описание",
+                cooking_time=cooking_time,
+                image="recipes/image.png",
+            )
+            recipe.tags.set(cls.tags[: number % len(cls.tags) + 1])
+
+    def assert_same_counts(self, queryset, top_authors):
+        self.assertEqual(
+            facets.grouped_counts(queryset, top_authors),
+            facets.separate_counts(queryset, top_authors),
+        )
+
+    def test_all_recipes(self):
+        self.assert_same_counts(Recipe.objects.all(), 10)
+
+    def test_filtered_by_tag(self):
+        self.assert_same_counts(
+            Recipe.objects.filter(tags__slug__in=["lunch", "dinner"]), 10
+        )
+
+    def test_empty_queryset(self):
+        self.assert_same_counts(Recipe.objects.none(), 10)
+
+    def test_top_authors_limit(self):
+        counts = facets.grouped_counts(Recipe.objects.all(), 1)
+        self.assertEqual(counts["authors"], {self.authors[0].id: 4})
+        self.assertEqual(sum(counts["cooking_time"].values()), 10)
+
+    def test_facets_endpoint(self):
+        response = APIClient().get("/api/recipes/facets/")
+        self.assertEqual(response.status_code, 200)
+        cooking_time = {
+            bucket["bucket"]: bucket["count"]
+            for bucket in response.json()["cooking_time"]
+        }
+        self.assertEqual(
+            cooking_time,
+            {"0-15": 2, "16-30": 2, "31-60": 2, "61-120": 2, "121+": 2},
+        )
+        tags = {tag["slug"]: tag["count"] for tag in response.json()["tags"]}
+        self.assertEqual(tags, {"breakfast": 10, "lunch": 6, "dinner": 3})
+
+
+class GenerationTests(TestCase):
+    def test_survives_cache_clear(self):
+        # Пустой кэш изображает другой процесс со своим LocMemCache.
+        value = facets.generation()
+        cache.clear()
+        self.assertEqual(facets.generation(), value)
+
+    def test_bump_after_commit(self):
+        key = facets.USER_GENERATION_KEY.format(1)
+        value = facets.generation(key)
+        with self.captureOnCommitCallbacks(execute=True):
+            facets.bump_generation(key)
+            self.assertEqual(facets.generation(key), value)
+        self.assertEqual(facets.generation(key), value + 1)
+
+    def test_bump_creates_missing_counter(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            facets.bump_generation("recipes:generation:test")
+        self.assertIsNotNone(facets.generation("recipes:generation:test"))
+
+
+class DensityTests(SimpleTestCase):
+    def test_exact_name(self):
+        self.assertEqual(units.density("Молоко"), 1.03)
+
+    def test_liquid_variant_uses_first_word(self):
+        self.assertEqual(units.density("кефир 2,5%"), 1.03)
+
+    def test_other_variants_are_unknown(self):
+        self.assertIsNone(units.density("молоко сухое"))
+        self.assertIsNone(units.density("мука цельнозерновая"))
+        self.assertEqual(units.canonical("молоко сухое", "ст. л."), ("мл", 15))
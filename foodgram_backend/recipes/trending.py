@@ -0,0 +1,52 @@
+from django.conf import settings
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import FavoriteRecipe, Recipe, ShoppingCart
+
+FAVORITE_WEIGHT = 1.0
+SHOPPING_CART_WEIGHT = 2.0
+MIN_SCORE = 1e-3
+
+
+def bump(recipe_ids, weight):
+    """Инкрементально меняет популярность рецептов.
+
+    Удаления из избранного и корзин популярность не уменьшают: вес
+    добавления к этому времени уже затух, и вычесть его целиком значило бы
+    занизить оценку. Их учитывает rebuild.
+    """
+    Recipe.objects.filter(pk__in=recipe_ids).update(
+        trending_score=Greatest(F("trending_score") + weight, Value(0.0))
+    )
+
+
+def decay(hours):
+    """Затухание популярности всех рецептов за прошедшие часы."""
+    factor = 0.5 ** (hours / settings.TRENDING_HALF_LIFE_HOURS)
+    Recipe.objects.filter(trending_score__gte=MIN_SCORE).update(
+        trending_score=F("trending_score") * factor
+    )
+    Recipe.objects.filter(
+        trending_score__gt=0, trending_score__lt=MIN_SCORE
+    ).update(trending_score=0)
+
+
+def count_subquery(model):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(recipe=OuterRef("pk"))
+            .values("recipe")
+            .annotate(total=Count("id"))
+            .values("total")
+        ),
+        0,
+    )
+
+
+def rebuild():
+    """Пересчитывает популярность с нуля по избранному и корзинам."""
+    Recipe.objects.update(
+        trending_score=count_subquery(FavoriteRecipe) * FAVORITE_WEIGHT
+        + count_subquery(ShoppingCart) * SHOPPING_CART_WEIGHT
+    )
@@ -0,0 +1,103 @@
+import numpy as np
+
+MASS = "г"
+VOLUME = "мл"
+
+UNITS = {
+    "мг": (MASS, 0.001),
+    "г": (MASS, 1),
+    "кг": (MASS, 1000),
+    "капля": (VOLUME, 0.05),
+    "мл": (VOLUME, 1),
+    "ч. л.": (VOLUME, 5),
+    "десертная ложка": (VOLUME, 10),
+    "ст. л.": (VOLUME, 15),
+    "стакан": (VOLUME, 250),
+    "л": (VOLUME, 1000),
+}
+LARGE_UNITS = {MASS: ("кг", 1000), VOLUME: ("л", 1000)}
+
+# Плотность, г/мл, по полному названию ингредиента.
+DENSITIES = {
+    "вода": 1.0,
+    "молоко": 1.03,
+    "кефир": 1.03,
+    "сливки": 1.0,
+    "сметана": 1.0,
+    "мука": 0.55,
+    "крахмал": 0.65,
+    "сахар": 0.85,
+    "сахарная пудра": 0.6,
+    "соль": 1.2,
+    "мед": 1.4,
+    "рис": 0.85,
+    "масло": 0.92,
+    "растительное масло": 0.92,
+    "уксус": 1.01,
+    "соевый соус": 1.15,
+}
+# Жидкости, у разновидностей которых ("кефир 1%", "уксус столовый") та же
+# плотность: только для них название ищется и по первому слову. Для
+# остальных первое слово ничего не говорит: "молоко сухое" - порошок.
+LIQUIDS = frozenset(("вода", "кефир", "сливки", "сметана", "уксус"))
+
+
+def density(name):
+    """Плотность ингредиента, г/мл, или None, если она неизвестна."""
+    name = name.lower()
+    if name in DENSITIES:
+        return DENSITIES[name]
+    first_word = name.split(" ", 1)[0]
+    if first_word in LIQUIDS:
+        return DENSITIES[first_word]
+    return None
+
+
+def canonical(name, unit):
+    """Каноническая единица ингредиента и множитель перевода в неё."""
+    if unit not in UNITS:
+        return unit, 1
+    base, factor = UNITS[unit]
+    if base == VOLUME:
+        grams_per_ml = density(name)
+        if grams_per_ml:
+            return MASS, factor * grams_per_ml
+    return base, factor
+
+
+def readable(amount, unit):
+    """Переводит сумму в крупную единицу и округляет для чтения."""
+    if unit in LARGE_UNITS:
+        large, factor = LARGE_UNITS[unit]
+        if amount >= factor:
+            amount, unit = amount / factor, large
+    amount = round(amount, 2)
+    if amount == int(amount):
+        amount = int(amount)
+    return amount, unit
+
+
+def aggregate(rows):
+    """Суммирует строки (название, единица, количество) по продуктам.
+
+    Совместимые единицы приводятся к граммам или миллилитрам, после чего
+    суммы по каждому продукту считаются за один проход.
+    """
+    rows = list(rows)
+    if not rows:
+        return []
+    keys, factors = [], np.empty(len(rows))
+    for index, (name, unit, _) in enumerate(rows):
+        base, factors[index] = canonical(name, unit)
+        keys.append(f"{name}\x00{base}")
+    amounts = np.fromiter(
+        (amount for _, _, amount in rows), dtype=float, count=len(rows)
+    )
+    groups, inverse = np.unique(keys, return_inverse=True)
+    totals = np.bincount(inverse, weights=amounts * factors)
+    result = []
+    for key, total in zip(groups, totals):
+        name, base = key.split("\x00")
+        amount, unit = readable(float(total), base)
+        result.append((name, unit, amount))
+    return result
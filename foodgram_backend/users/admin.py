@@ -1,14 +1,20 @@
 from django.contrib import admin
 
+from recipes import deletion
+from recipes.admin import FastDeleteAdmin, ScalableAdmin
+
 from .models import Subscribe, User
 
 
 @admin.register(User)
-class UserAdmin(admin.ModelAdmin):
+class UserAdmin(FastDeleteAdmin):
     list_display = ("username", "email")
-    list_filter = ("username", "email")
+    search_fields = ("^username", "=email")
+    delete_function = staticmethod(deletion.schedule_users_deletion)
 
 
 @admin.register(Subscribe)
-class SubscribeAdmin(admin.ModelAdmin):
-    pass
+class SubscribeAdmin(ScalableAdmin):
+    list_display = ("user", "author")
+    list_select_related = ("user", "author")
+    autocomplete_fields = ("user", "author")